@@ -116,16 +116,11 @@ def main():
                 print_result("Motor Connection", result)
                 wait_for_input()
                 
-                # Get status after connection
-                print_section("Post-Connection Status")
-                status = client.status()
-                print_result("Status After Connect", status)
-                wait_for_input()
-                
-                # Get current position
-                print_section("Position Reading")
-                position = client.get_position()
-                print_result("Current Position", f"{position}°")
+                # Status, health, hotels and position in one request
+                print_section("Post-Connection Snapshot")
+                snapshot = client.snapshot()
+                print_result("Snapshot After Connect", snapshot)
+                print(f"   Current position: {snapshot.get('position')}°")
                 wait_for_input()
                 
                 # Demonstrate movement
@@ -196,6 +191,7 @@ def main():
         methods = [
             "client.status()",
             "client.health()", 
+            "client.snapshot(fields=['status', 'position'])",
             "client.connect(device='/dev/ttyUSB0', baudrate=57600, motor_id=1)",
             "client.disconnect()",
             "client.get_position()",
@@ -10,5 +10,6 @@ __author__ = "Acceleration Consortium"
 __email__ = "info@acceleration.utoronto.ca"
 
 from .core import PlateResort
+from .group import ResortGroup
 
-__all__ = ["PlateResort"]
+__all__ = ["PlateResort", "ResortGroup"]
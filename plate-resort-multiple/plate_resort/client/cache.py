@@ -0,0 +1,115 @@
+"""
+Validator cache for conditional GETs
+
+Keeps the last response of cacheable requests with its ETag, Last-Modified
+and freshness lifetime, in memory and optionally on disk, so repeated calls
+(and separate CLI invocations) revalidate with a 304 instead of downloading
+the same metadata again.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_DIR = "~/.plate-resort/client-cache"
+
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def max_age(cache_control: Optional[str]) -> Optional[float]:
+    """Freshness lifetime from a Cache-Control header, None if not storable"""
+    cache_control = (cache_control or "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+    match = MAX_AGE.search(cache_control)
+    return float(match.group(1)) if match else 0.0
+
+
+class ResponseCache:
+    """
+    Last response per request key, with its validators
+
+    Args:
+        directory: Where persistent entries are kept; None keeps everything
+            in memory only
+    """
+
+    def __init__(self, directory: Optional[str] = DEFAULT_DIR):
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def get(self, key: str, persistent: bool = False) -> Optional[Dict[str, Any]]:
+        """Stored entry for key, loading it from disk if persistent"""
+        entry = self.entries.get(key)
+        if entry is None and persistent and self.directory:
+            try:
+                with open(self._path(key)) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+            if entry.get("key") != key:
+                return None
+            self.entries[key] = entry
+        return entry
+
+    def put(self, key: str, response, body: Any, persistent: bool = False):
+        """Store a response body if it carries a validator and may be stored"""
+        lifetime = max_age(response.headers.get("Cache-Control"))
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if lifetime is None or not (etag or last_modified):
+            return
+        entry = {
+            "key": key,
+            "etag": etag,
+            "last_modified": last_modified,
+            "expires": time.time() + lifetime,
+            "body": body,
+        }
+        self.entries[key] = entry
+        if persistent:
+            self._save(entry)
+
+    def refresh(self, key: str, response, persistent: bool = False):
+        """Renew an entry's freshness after a 304 Not Modified"""
+        entry = self.entries[key]
+        entry["expires"] = time.time() + (max_age(response.headers.get("Cache-Control")) or 0.0)
+        # A 304 may omit validators; keep the stored ones
+        entry["etag"] = response.headers.get("ETag") or entry["etag"]
+        entry["last_modified"] = response.headers.get("Last-Modified") or entry["last_modified"]
+        if persistent:
+            self._save(entry)
+
+    def _save(self, entry: Dict[str, Any]):
+        if not self.directory:
+            return
+        path = self._path(entry["key"])
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + ".tmp", "w") as f:
+                json.dump(entry, f)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass  # Read-only home: the memory cache still works
+
+    @staticmethod
+    def fresh(entry: Dict[str, Any]) -> bool:
+        """Whether an entry can be used without asking the server"""
+        return time.time() < entry["expires"]
+
+    @staticmethod
+    def validators(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Request headers revalidating an entry"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
@@ -1,44 +1,121 @@
 import os
 import sys
+import json
+import time
+import uuid
 import requests
 import argparse
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List
+
+from .cache import DEFAULT_DIR, ResponseCache
+from .unix import UnixSocketAdapter, base_url, socket_path
 
 
 class PlateResortClient:
     """Python client for Plate Resort API"""
     
-    def __init__(self, api_url: str = None, api_key: str = None):
+    def __init__(self, api_url: str = None, api_key: str = None, resort: str = None,
+                 timeout: float = None, retries: int = 0, cache_dir: str = None):
         self.api_url = api_url or os.getenv("PLATE_API_URL", "http://plate-resort.local:8000")
         self.api_key = api_key or os.getenv("PLATE_API_KEY", "changeme")
         self.headers = {"x-api-key": self.api_key}
+        self.session = requests.Session()
+        # Seconds per attempt (None waits forever) and extra attempts after a
+        # connection error or timeout; mutating requests carry an
+        # Idempotency-Key so a retry never repeats a move
+        self.timeout = timeout
+        self.retries = retries
+        # unix:///path/to/api.sock talks to a server on this host over its
+        # Unix socket; access is by socket permissions and the key is ignored
+        if self.api_url.startswith("unix://"):
+            path = socket_path(self.api_url)
+            self.api_url = base_url(path)
+            self.session.mount(self.api_url, UnixSocketAdapter(path))
+        # Address one resort of a multi-resort server (the first one if None)
+        self.resort = resort or os.getenv("PLATE_RESORT_ID")
+        self.base_url = self.api_url
+        if self.resort:
+            self.base_url = f"{self.api_url}/resorts/{self.resort}"
+        # Last responses of conditional GETs with their ETag/Last-Modified;
+        # metadata is also kept on disk (cache_dir, "" for memory only)
+        if cache_dir is None:
+            cache_dir = os.getenv("PLATE_CACHE_DIR", DEFAULT_DIR)
+        self.cache = ResponseCache(cache_dir)
     
-    def _request(self, method: str, endpoint: str, json_data: Dict = None) -> Dict[str, Any]:
-        """Make HTTP request to API"""
-        url = f"{self.api_url}{endpoint}"
+    def _request(self, method: str, endpoint: str, json_data: Dict = None,
+                 params: Dict = None, timeout: float = None,
+                 conditional: bool = False, persistent: bool = False) -> Dict[str, Any]:
+        """
+        Make HTTP request to API
         
-        try:
-            if method.upper() == "GET":
-                response = requests.get(url, headers=self.headers)
-            elif method.upper() == "POST":
-                response = requests.post(url, json=json_data, headers=self.headers)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
-            
-            response.raise_for_status()
-            return response.json()
+        With conditional, a GET revalidates the last response for the same
+        URL and parameters (If-None-Match / If-Modified-Since) and reuses its
+        body on 304 Not Modified, or without asking while Cache-Control
+        max-age says it is fresh. persistent also keeps it on disk.
+        """
+        url = f"{self.base_url}{endpoint}"
+        timeout = timeout or self.timeout
+        headers = self.headers
+        if method.upper() in ("POST", "DELETE"):
+            headers = dict(self.headers, **{"Idempotency-Key": uuid.uuid4().hex})
+        cache_key = cached = None
+        if conditional and method.upper() == "GET":
+            cache_key = json.dumps([url, params], sort_keys=True)
+            cached = self.cache.get(cache_key, persistent)
+            if cached:
+                if self.cache.fresh(cached):
+                    return cached["body"]
+                headers = dict(headers, **self.cache.validators(cached))
         
-        except requests.exceptions.RequestException as e:
-            return {"error": str(e)}
+        for attempt in range(self.retries + 1):
+            try:
+                if method.upper() == "GET":
+                    response = self.session.get(url, headers=headers, params=params,
+                                                timeout=timeout)
+                elif method.upper() == "POST":
+                    response = self.session.post(url, json=json_data, headers=headers,
+                                                 timeout=timeout)
+                elif method.upper() == "DELETE":
+                    response = self.session.delete(url, headers=headers, params=params,
+                                                   timeout=timeout)
+                else:
+                    raise ValueError(f"Unsupported method: {method}")
+                
+                if response.status_code == 304 and cached:
+                    self.cache.refresh(cache_key, response, persistent)
+                    return cached["body"]
+                response.raise_for_status()
+                body = response.json()
+                if cache_key:
+                    self.cache.put(cache_key, response, body, persistent)
+                return body
+            
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.retries:
+                    return {"error": str(e)}
+                time.sleep(min(0.2 * 2 ** attempt, 5.0))
+            except requests.exceptions.RequestException as e:
+                return {"error": str(e)}
     
-    def connect(self, device="/dev/ttyUSB0", baudrate=57600, motor_id=1) -> Dict[str, Any]:
-        """Connect to Dynamixel motor"""
+    def connect(self, device=None, baudrate=None, motor_id=None) -> Dict[str, Any]:
+        """Connect to Dynamixel motor (server-configured values if None)"""
         return self._request("POST", "/connect", {
             "device": device,
             "baudrate": baudrate,
             "motor_id": motor_id
         })
     
+    def discover(self, baudrates: List[int] = None, scan: bool = False) -> Dict[str, Any]:
+        """
+        Find motors on the bus by broadcast ping
+        
+        Other baud rates (or every supported rate with scan) can only be
+        scanned while disconnected.
+        """
+        return self._request("GET", "/discover", params={
+            "baud": baudrates or [], "scan": scan
+        })
+    
     def disconnect(self) -> Dict[str, Any]:
         """Disconnect from motor"""
         return self._request("POST", "/disconnect")
@@ -51,13 +128,113 @@ class PlateResortClient:
         """Get motor health diagnostics"""
         return self._request("GET", "/health")
     
-    def activate_hotel(self, hotel: str) -> Dict[str, Any]:
+    def activate_hotel(self, hotel: str, priority: str = "normal",
+                       deadline: float = None, dry_run: bool = False) -> Dict[str, Any]:
         """Move to specified hotel"""
-        return self._request("POST", "/activate", {"hotel": hotel})
+        return self._request("POST", "/activate", {
+            "hotel": hotel, "priority": priority, "deadline": deadline,
+            "dry_run": dry_run
+        })
     
-    def go_home(self) -> Dict[str, Any]:
+    def go_home(self, priority: str = "normal",
+                deadline: float = None, dry_run: bool = False) -> Dict[str, Any]:
         """Return to home position"""
-        return self._request("POST", "/home")
+        return self._request("POST", "/home", {
+            "priority": priority, "deadline": deadline, "dry_run": dry_run
+        })
+    
+    def list_plates(self) -> Dict[str, Any]:
+        """List all plates in the inventory"""
+        return self._request("GET", "/plates")
+    
+    def place_plate(self, plate_id: str, hotel: str, room: int = None) -> Dict[str, Any]:
+        """Record a plate in a hotel room (lowest free room if None)"""
+        return self._request("POST", "/plates", {
+            "plate_id": plate_id, "hotel": hotel, "room": room
+        })
+    
+    def locate_plate(self, plate_id: str) -> Dict[str, Any]:
+        """Find the hotel and room holding a plate"""
+        return self._request("GET", f"/plates/{plate_id}")
+    
+    def remove_plate(self, plate_id: str) -> Dict[str, Any]:
+        """Remove a plate from the inventory"""
+        return self._request("DELETE", f"/plates/{plate_id}")
+    
+    def activate_plate(self, plate_id: str, priority: str = "normal",
+                       deadline: float = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Move to the hotel holding a plate"""
+        return self._request("POST", f"/plates/{plate_id}/activate", {
+            "priority": priority, "deadline": deadline, "dry_run": dry_run
+        })
+    
+    def recommend_slot(self, plate_id: str = None) -> Dict[str, Any]:
+        """Recommend a slot for a new or returning plate"""
+        return self._request("GET", "/placement", params={"plate_id": plate_id})
+    
+    def rebalance_plan(self) -> Dict[str, Any]:
+        """Get a plan moving frequently accessed plates to the cheapest hotels"""
+        return self._request("GET", "/placement/rebalance")
+    
+    def retrieve(self, plates: List[str] = None, slots: List[Dict] = None,
+                 priority: str = "normal") -> Iterator[Dict[str, Any]]:
+        """
+        Start a bulk retrieval and yield its progress events
+        
+        Call release(job_id) after each "arrived" event once the robot
+        has finished at that hotel.
+        """
+        try:
+            response = self.session.post(
+                f"{self.base_url}/retrieve",
+                json={"plates": plates or [], "slots": slots or [], "priority": priority},
+                headers=self.headers,
+                stream=True,
+            )
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+        except requests.exceptions.RequestException as e:
+            yield {"event": "error", "detail": str(e)}
+    
+    def release(self, job_id: str) -> Dict[str, Any]:
+        """Release the motor at the current hotel of a retrieval job"""
+        return self._request("POST", f"/retrieve/{job_id}/release")
+    
+    def free_slots(self, hotel: str = None) -> Dict[str, Any]:
+        """List free slots, optionally for one hotel"""
+        return self._request("GET", "/slots", params={"hotel": hotel})
+    
+    def estimate(self, hotels: List[str] = None,
+                 angles: List[float] = None) -> Dict[str, Any]:
+        """Predict move durations to hotels or angles from the current position"""
+        return self._request("GET", "/estimate", params={
+            "hotel": hotels or [], "angle": angles or []
+        })
+    
+    def moves(self, limit: int = 50, target: str = None) -> Dict[str, Any]:
+        """Get recent move history"""
+        return self._request("GET", "/moves", params={"limit": limit, "target": target})
+    
+    def calibrate(self, hotels: List[str] = None, repeats: int = 1,
+                  priority: str = "normal") -> Dict[str, Any]:
+        """Calibrate hotels (all if None) from both directions"""
+        return self._request("POST", "/calibration", {
+            "hotels": hotels, "repeats": repeats, "priority": priority
+        })
+    
+    def calibration(self) -> Dict[str, Any]:
+        """Get the per-hotel calibration table"""
+        return self._request("GET", "/calibration")
+    
+    def clear_calibration(self, hotels: List[str] = None) -> Dict[str, Any]:
+        """Drop calibration for hotels (all if None)"""
+        return self._request("DELETE", "/calibration", params={"hotels": hotels})
+    
+    def queue(self) -> Dict[str, Any]:
+        """Get motion queue depth and expected waits"""
+        return self._request("GET", "/queue")
     
     def set_speed(self, speed: int) -> Dict[str, Any]:
         """Set motor movement speed"""
@@ -67,17 +244,55 @@ class PlateResortClient:
         """Emergency stop motor"""
         return self._request("POST", "/emergency_stop")
     
+    def resorts(self) -> Dict[str, Any]:
+        """List the resorts served by the server"""
+        try:
+            response = self.session.get(f"{self.api_url}/resorts", headers=self.headers)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            return {"error": str(e)}
+    
+    def wait(self, idle: bool = False, hotel: str = None, angle: float = None,
+             tolerance: float = None, version: int = None,
+             timeout: float = 30.0) -> Dict[str, Any]:
+        """
+        Block until the given conditions hold (idle if none), or timeout
+        
+        Returns "met" plus the motion state and its version; pass the version
+        back to wait for the next state change.
+        """
+        return self._request("GET", "/wait", params={
+            "idle": idle, "hotel": hotel, "angle": angle, "tolerance": tolerance,
+            "version": version, "timeout": timeout
+        }, timeout=timeout + 10)
+    
+    def snapshot(self, fields: List[str] = None) -> Dict[str, Any]:
+        """
+        Status, health, hotels and position in one request
+        
+        Select sections with fields (e.g. ["status", "position"]); an
+        unchanged snapshot is answered with 304 and served from the last one.
+        """
+        return self._request("GET", "/snapshot", params={
+            "fields": ",".join(fields) if fields else None
+        }, conditional=True)
+    
     def get_hotels(self) -> Dict[str, Any]:
-        """Get available hotels"""
-        return self._request("GET", "/hotels")
+        """Get available hotels (cached, revalidated with the server)"""
+        return self._request("GET", "/hotels", conditional=True, persistent=True)
     
     def get_position(self) -> Dict[str, Any]:
         """Get current motor position"""
         return self._request("GET", "/position")
     
-    def move_to_angle(self, angle: float) -> Dict[str, Any]:
+    def move_to_angle(self, angle: float, priority: str = "normal",
+                      deadline: float = None, dry_run: bool = False) -> Dict[str, Any]:
         """Move to specific angle in degrees"""
-        return self._request("POST", "/move_to_angle", {"angle": angle})
+        return self._request("POST", "/move_to_angle", {
+            "angle": angle, "priority": priority, "deadline": deadline,
+            "dry_run": dry_run
+        })
 
 
 def main():
@@ -87,12 +302,20 @@ def main():
                         help="Server host (default: localhost)")
     parser.add_argument("--port", type=int, default=8000,
                         help="Server port (default: 8000)")
+    parser.add_argument("--url",
+                        help="API URL instead of --host/--port, e.g. unix:///path/to/api.sock")
     parser.add_argument("--api-key", 
                         help="API key for authentication")
+    parser.add_argument("--resort",
+                        help="Resort ID on a multi-resort server (default: first)")
     parser.add_argument("command", 
                         choices=["connect", "disconnect", "status", "health", 
                                  "activate", "home", "speed", "stop", "hotels", 
-                                 "position", "move"],
+                                 "position", "move", "queue", "estimate",
+                                 "plates", "place", "locate", "remove",
+                                 "fetch", "slots", "recommend", "rebalance",
+                                 "resorts", "discover", "board", "wait",
+                                 "snapshot", "calibrate", "calibration"],
                         help="Command to execute")
     parser.add_argument("args", nargs="*", 
                         help="Additional arguments for command")
@@ -100,18 +323,19 @@ def main():
     args = parser.parse_args()
     
     # Build API URL
-    api_url = f"http://{args.host}:{args.port}"
+    api_url = args.url or f"http://{args.host}:{args.port}"
     
     # Initialize client
-    client = PlateResortClient(api_url=api_url, api_key=args.api_key)
+    client = PlateResortClient(api_url=api_url, api_key=args.api_key,
+                               resort=args.resort)
     
     command = args.command.lower()
     
     try:
         if command == "connect":
-            device = args.args[0] if len(args.args) > 0 else "/dev/ttyUSB0"
-            baudrate = int(args.args[1]) if len(args.args) > 1 else 57600
-            motor_id = int(args.args[2]) if len(args.args) > 2 else 1
+            device = args.args[0] if len(args.args) > 0 else None
+            baudrate = int(args.args[1]) if len(args.args) > 1 else None
+            motor_id = int(args.args[2]) if len(args.args) > 2 else None
             result = client.connect(device, baudrate, motor_id)
         
         elif command == "disconnect":
@@ -156,6 +380,79 @@ def main():
             angle = float(args.args[0])
             result = client.move_to_angle(angle)
         
+        elif command == "queue":
+            result = client.queue()
+        
+        elif command == "estimate":
+            if len(args.args) < 1:
+                print("Error: Hotel(s) required (e.g., estimate C D)")
+                return
+            result = client.estimate([h.upper() for h in args.args])
+        
+        elif command == "plates":
+            result = client.list_plates()
+        
+        elif command == "place":
+            if len(args.args) < 2:
+                print("Error: Plate ID and hotel required (e.g., place P001 A [room])")
+                return
+            room = int(args.args[2]) if len(args.args) > 2 else None
+            result = client.place_plate(args.args[0], args.args[1].upper(), room)
+        
+        elif command in ("locate", "remove", "fetch"):
+            if len(args.args) < 1:
+                print("Error: Plate ID required")
+                return
+            if command == "locate":
+                result = client.locate_plate(args.args[0])
+            elif command == "remove":
+                result = client.remove_plate(args.args[0])
+            else:
+                result = client.activate_plate(args.args[0])
+        
+        elif command == "slots":
+            hotel = args.args[0].upper() if len(args.args) > 0 else None
+            result = client.free_slots(hotel)
+        
+        elif command == "recommend":
+            plate_id = args.args[0] if len(args.args) > 0 else None
+            result = client.recommend_slot(plate_id)
+        
+        elif command == "rebalance":
+            result = client.rebalance_plan()
+        
+        elif command == "resorts":
+            result = client.resorts()
+        
+        elif command == "discover":
+            # discover [all | baud ...]
+            if args.args == ["all"]:
+                result = client.discover(scan=True)
+            else:
+                result = client.discover([int(b) for b in args.args])
+        
+        elif command == "calibrate":
+            # calibrate [hotel ...]: all hotels if none given
+            result = client.calibrate([h.upper() for h in args.args] or None)
+        
+        elif command == "calibration":
+            result = client.calibration()
+        
+        elif command == "snapshot":
+            # snapshot [field ...]: status, health, hotels, position
+            result = client.snapshot(args.args or None)
+        
+        elif command == "wait":
+            # wait [hotel] : until idle, or until the hotel is active
+            result = client.wait(hotel=args.args[0] if args.args else None)
+        
+        elif command == "board":
+            # board [path prefix]: read the status board of a server on this host
+            from plate_resort.server.board import StatusBoard, board_path
+            board_config = {"path": args.args[0]} if args.args else {}
+            path = board_path(board_config, args.resort or "default")
+            result = StatusBoard(path).read() or {"error": f"No status board at {path}"}
+        
         print(result)
         
     except Exception as e:
@@ -0,0 +1,69 @@
+"""
+requests transport for the server's local Unix domain socket
+
+Mounted by PlateResortClient for unix:// API URLs, e.g.
+unix:///home/pi/.plate-resort/api.sock
+"""
+import os
+import socket
+from urllib.parse import quote
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+SCHEME = "http+unix://"
+
+
+def socket_path(api_url: str) -> str:
+    """Socket path of a unix:// API URL"""
+    return os.path.expanduser(api_url[len("unix://"):])
+
+
+def base_url(path: str) -> str:
+    """
+    URL the client sends requests for a socket to: the quoted socket path
+    stands in for the host, so the adapter mount and cached responses are
+    kept apart per socket
+    """
+    return SCHEME + quote(os.path.abspath(path), safe="")
+
+
+class UnixHTTPConnection(HTTPConnection):
+    def __init__(self, path: str, **kwargs):
+        super().__init__("localhost", **kwargs)
+        self.socket_path = path
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+
+class UnixHTTPConnectionPool(HTTPConnectionPool):
+    def __init__(self, path: str, **kwargs):
+        super().__init__("localhost", **kwargs)
+        self.socket_path = path
+
+    def _new_conn(self):
+        return UnixHTTPConnection(self.socket_path, timeout=self.timeout.connect_timeout)
+
+
+class UnixSocketAdapter(HTTPAdapter):
+    """Send every request of a requests.Session over one Unix socket"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.pool = UnixHTTPConnectionPool(path)
+
+    def get_connection(self, url, proxies=None):
+        return self.pool
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self.pool
+
+    def close(self):
+        super().close()
+        self.pool.close()
@@ -2,9 +2,20 @@
 """
 PlateResort class for controlling Dynamixel-based plate storage system
 """
-from dynamixel_sdk import PortHandler, PacketHandler
+from dynamixel_sdk import PortHandler, PacketHandler, COMM_SUCCESS
 import yaml
 import os
+import time
+
+from .estimator import MoveEstimator
+from .inventory import PlateInventory
+from .protocol import LockedPacketHandler, NativePacketHandler
+
+# Baud rates supported by X-series motors, most common first
+BAUD_RATES = [57600, 1000000, 115200, 2000000, 3000000, 4000000, 4500000, 9600]
+
+# Config keys read only when connecting: changing them needs a reconnect
+CONNECTION_KEYS = ('device', 'baudrate', 'motor_id', 'transport', 'motor_ids')
 
 class PlateResort:
     def __init__(self, config_file="resort_config.yaml", **overrides):
@@ -15,13 +26,8 @@ class PlateResort:
             config_file: Path to YAML configuration file
             **overrides: Override any config values (e.g., speed=30, offset_angle=15)
         """
-        # Load configuration
-        self.config = self._load_config(config_file)
-        
-        # Apply any overrides
-        for key, value in overrides.items():
-            if key in self.config:
-                self.config[key] = value
+        # Load configuration and apply any overrides
+        self.config = self.with_overrides(self._load_config(config_file), overrides)
         
         # Set attributes from config
         self.device = self.config['device']
@@ -33,15 +39,19 @@ class PlateResort:
         self.offset_angle = self.config['offset_angle']
         self.rotation_direction = self.config['rotation_direction']
         
-        # Calculate hotel angles automatically
-        delta_angle = 360.0 / len(self.hotels) * self.rotation_direction
-        self.hotel_angles = {}
-        for i, hotel in enumerate(self.hotels):
-            self.hotel_angles[hotel] = self.offset_angle + (i * delta_angle)
-            
+        self.inventory = PlateInventory(self.hotels, self.rooms)
         self.current_hotel = None
+        self.last_position = None
+        # Per-hotel tick offsets and approach directions from calibrate()
+        self.calibration = {}
+        self.discovered = None
         self.port = None
         self.packet_handler = None
+        self.estimator = MoveEstimator(
+            self.speed,
+            self.config.get('profile_acceleration', 0),
+            self.config.get('settle_time', 0.2),
+        )
         
         # Dynamixel constants
         self.ADDR_TORQUE_ENABLE = 64
@@ -50,12 +60,19 @@ class PlateResort:
         self.ADDR_GOAL_TORQUE = 102
         self.ADDR_TORQUE_LIMIT = 32
         self.ADDR_PRESENT_TEMPERATURE = 146
-        self.ADDR_PRESENT_CURRENT = 144
+        self.ADDR_PRESENT_CURRENT = 126
         self.ADDR_PRESENT_VOLTAGE = 144
         self.ADDR_HARDWARE_ERROR = 70
+        self.ADDR_PROFILE_ACCELERATION = 108
+        self.ADDR_PROFILE_VELOCITY = 112
         self.MAX_POSITION = 4095
         self.MAX_ANGLE = 360.0
         
+        # Calculate hotel angles and goal positions automatically
+        layout = self.derive_layout(self.config)
+        self.hotel_angles = layout['hotel_angles']
+        self.hotel_ticks = layout['hotel_ticks']
+        
     def _load_config(self, config_file):
         """Load configuration from YAML file"""
         if not os.path.exists(config_file):
@@ -66,15 +83,157 @@ class PlateResort:
             
         return config['resort']
         
-    def connect(self):
-        """Connect to Dynamixel motor"""
-        self.port = PortHandler(self.device)
-        self.packet_handler = PacketHandler(2.0)
+    @staticmethod
+    def with_overrides(config, overrides):
+        """Copy of a resort config with overrides applied to the keys it defines"""
+        return {**config, **{key: value for key, value in overrides.items() if key in config}}
         
-        if not self.port.openPort():
-            raise Exception(f"Failed to open port {self.device}")
-        if not self.port.setBaudRate(self.baud):
-            raise Exception(f"Failed to set baudrate {self.baud}")
+    def derive_layout(self, config):
+        """
+        Validate a resort config and compute the tables derived from it
+        
+        Args:
+            config: Resort config section, as loaded from YAML
+            
+        Returns:
+            dict: 'hotel_angles' (hotel -> degrees) and 'hotel_ticks'
+                (hotel -> goal position)
+                
+        Raises:
+            ValueError: If a value is missing or out of range
+        """
+        for key in ('hotels', 'rooms_per_hotel', 'offset_angle', 'rotation_direction',
+                    'default_speed', 'position_tolerance', 'movement_timeout',
+                    'goal_torque', 'torque_limit'):
+            if key not in config:
+                raise ValueError(f"Missing config value {key}")
+        hotels = config['hotels']
+        if not hotels or len(set(hotels)) != len(hotels):
+            raise ValueError(f"hotels must be a non-empty list of unique names, got {hotels}")
+        if not isinstance(config['rooms_per_hotel'], int) or config['rooms_per_hotel'] < 1:
+            raise ValueError("rooms_per_hotel must be a positive integer")
+        if config['rotation_direction'] not in (1, -1):
+            raise ValueError("rotation_direction must be 1 or -1")
+        for key in ('position_tolerance', 'movement_timeout'):
+            if not config[key] > 0:
+                raise ValueError(f"{key} must be positive")
+        for key in ('default_speed', 'profile_acceleration'):
+            if config.get(key, 0) < 0:
+                raise ValueError(f"{key} must not be negative")
+        for key in ('goal_torque', 'torque_limit'):
+            if not 0 <= config[key] <= 1023:
+                raise ValueError(f"{key} must be within 0-1023")
+        
+        delta_angle = 360.0 / len(hotels) * config['rotation_direction']
+        # Counter-clockwise layouts wrap below 0°
+        angles = {hotel: (config['offset_angle'] + i * delta_angle) % 360.0
+                  for i, hotel in enumerate(hotels)}
+        return {
+            'hotel_angles': angles,
+            'hotel_ticks': {hotel: self.angle_to_position(angle) for hotel, angle in angles.items()},
+        }
+        
+    def apply_config(self, config, layout=None):
+        """
+        Switch to a new resort config, e.g. after the config file changed
+        
+        Call between moves. Motor registers are written only for settings
+        whose configured value changed and differs from the motor's.
+        
+        Args:
+            config: Resort config section, overrides applied
+            layout: Result of derive_layout(config), computed if None
+            
+        Returns:
+            dict: 'changed' config keys and 'registers' written
+            
+        Raises:
+            ValueError: If the config is invalid, changes connection settings
+                while connected, or drops slots holding plates
+        """
+        if layout is None:
+            layout = self.derive_layout(config)
+        changed = sorted(key for key in set(config) | set(self.config)
+                         if config.get(key) != self.config.get(key))
+        if self.port is not None:
+            reconnect = [key for key in CONNECTION_KEYS if key in changed]
+            if reconnect:
+                raise ValueError(f"Changing {reconnect} requires disconnecting first")
+        if 'hotels' in changed or 'rooms_per_hotel' in changed:
+            self.inventory.resize(config['hotels'], config['rooms_per_hotel'])
+        
+        registers = []
+        if self.port is not None:
+            torque = [(name, address) for name, address in
+                      (('torque_limit', self.ADDR_TORQUE_LIMIT), ('goal_torque', self.ADDR_GOAL_TORQUE))
+                      if name in changed]
+            if torque:
+                # Written with torque off, as in connect()
+                self.packet_handler.write1ByteTxRx(self.port, self.motor_id, self.ADDR_TORQUE_ENABLE, 0)
+                for name, address in torque:
+                    self.packet_handler.write2ByteTxRx(self.port, self.motor_id, address, config[name])
+                    registers.append(name)
+                self.packet_handler.write1ByteTxRx(self.port, self.motor_id, self.ADDR_TORQUE_ENABLE, 1)
+            if 'default_speed' in changed and config['default_speed'] != self.speed:
+                self.packet_handler.write4ByteTxRx(self.port, self.motor_id, self.ADDR_PROFILE_VELOCITY,
+                                                   config['default_speed'])
+                registers.append('default_speed')
+            if 'profile_acceleration' in changed:
+                self.packet_handler.write4ByteTxRx(self.port, self.motor_id, self.ADDR_PROFILE_ACCELERATION,
+                                                   config.get('profile_acceleration', 0))
+                registers.append('profile_acceleration')
+        
+        # Tables first, so a hotel in the new list always has an angle
+        self.hotel_angles = layout['hotel_angles']
+        self.hotel_ticks = layout['hotel_ticks']
+        self.config = config
+        self.hotels = config['hotels']
+        self.rooms = config['rooms_per_hotel']
+        self.offset_angle = config['offset_angle']
+        self.rotation_direction = config['rotation_direction']
+        self.device = config['device']
+        self.baud = config['baudrate']
+        self.motor_id = config['motor_id']
+        if 'default_speed' in changed:
+            self.speed = self.estimator.velocity = config['default_speed']
+        self.estimator.acceleration = config.get('profile_acceleration', 0)
+        self.estimator.settle_time = config.get('settle_time', 0.2)
+        if self.current_hotel not in self.hotel_angles:
+            self.current_hotel = None
+        # Calibration was measured at the old angles
+        self.calibration = {hotel: entry for hotel, entry in self.calibration.items()
+                            if layout['hotel_ticks'].get(hotel) == entry.get('goal_position')}
+        return {'changed': changed, 'registers': registers}
+        
+    def connect(self, port=None, packet_handler=None):
+        """
+        Connect to Dynamixel motor
+        
+        Args:
+            port: Already open PortHandler shared with other motors on the bus
+            packet_handler: LockedPacketHandler to use with a shared port
+        """
+        if port is not None:
+            self.port = port
+            self.packet_handler = packet_handler or self.make_packet_handler()
+        else:
+            self.port = PortHandler(self.device)
+            self.packet_handler = self.make_packet_handler()
+            
+            if not self.port.openPort():
+                raise Exception(f"Failed to open port {self.device}")
+            if not self.port.setBaudRate(self.baud):
+                raise Exception(f"Failed to set baudrate {self.baud}")
+            
+        if self.config.get('discover_on_connect'):
+            self.discovered = self._broadcast_ping(self.port, self.packet_handler, self.baud)
+            ids = [motor['id'] for motor in self.discovered]
+            print(f"Motors on bus: {ids}")
+            if self.motor_id not in ids:
+                if port is None:
+                    self.port.closePort()
+                self.port = None
+                raise Exception(f"Motor {self.motor_id} not found on {self.device}. Found: {ids}")
             
         # Set position control mode and enable torque
         self.packet_handler.write1ByteTxRx(self.port, self.motor_id, self.ADDR_TORQUE_ENABLE, 0)
@@ -86,10 +245,96 @@ class PlateResort:
         
         self.packet_handler.write1ByteTxRx(self.port, self.motor_id, self.ADDR_TORQUE_ENABLE, 1)
         
-        # Set profile velocity (speed)
-        self.packet_handler.write4ByteTxRx(self.port, self.motor_id, 112, self.speed)
+        # Set motion profile (speed and acceleration)
+        self.packet_handler.write4ByteTxRx(self.port, self.motor_id, self.ADDR_PROFILE_VELOCITY, self.speed)
+        self.packet_handler.write4ByteTxRx(self.port, self.motor_id, self.ADDR_PROFILE_ACCELERATION,
+                                           self.config.get('profile_acceleration', 0))
+        
+    def make_packet_handler(self):
+        """
+        Protocol 2.0 packet handler for the configured transport ('sdk' or
+        'native'), taking the bus lock for every transaction
+        """
+        transport = self.config.get('transport', 'sdk')
+        if transport == 'native':
+            return LockedPacketHandler(NativePacketHandler())
+        if transport != 'sdk':
+            raise ValueError(f"Unknown transport {transport}. Available: ['sdk', 'native']")
+        return LockedPacketHandler(PacketHandler(2.0))
+        
+    def discover(self, baudrates=None):
+        """
+        Find every motor on the bus with one broadcast ping per baud rate
+        
+        Args:
+            baudrates: Baud rates to scan (configured baud rate if None, or
+                BAUD_RATES for all supported rates); scanning other rates
+                requires being disconnected
+            
+        Returns:
+            list: One dict per motor with id, model_number, firmware and baudrate
+        """
+        if self.port is not None:
+            if baudrates and list(baudrates) != [self.baud]:
+                raise ValueError("Disconnect before scanning other baud rates")
+            return self._broadcast_ping(self.port, self.packet_handler, self.baud)
+            
+        port = PortHandler(self.device)
+        packet_handler = self.make_packet_handler()
+        if not port.openPort():
+            raise Exception(f"Failed to open port {self.device}")
+            
+        motors = []
+        try:
+            for baud in baudrates or [self.baud]:
+                if not port.setBaudRate(baud):
+                    print(f"✗ Baud rate {baud} not supported by {self.device}")
+                    continue
+                found = self._broadcast_ping(port, packet_handler, baud)
+                print(f"{baud} bps: {[motor['id'] for motor in found] or 'no motors'}")
+                motors.extend(found)
+        finally:
+            port.closePort()
+        return motors
+        
+    def _broadcast_ping(self, port, packet_handler, baud):
+        """Broadcast ping at the port's current baud rate"""
+        data, _ = packet_handler.broadcastPing(port)  # Timeout result just means no motors
+        return [
+            {'id': motor_id, 'model_number': model, 'firmware': firmware, 'baudrate': baud}
+            for motor_id, (model, firmware) in sorted(data.items())
+        ]
+        
+    def angle_to_position(self, angle):
+        """Convert an angle in degrees to a goal position in motor ticks"""
+        if not 0 <= angle <= self.MAX_ANGLE:
+            raise ValueError(f"Angle {angle} out of range (0-{self.MAX_ANGLE:.0f}°)")
+        return int(angle * self.MAX_POSITION / self.MAX_ANGLE)
+        
+    def plan_move(self, target):
+        """
+        Validate a move and compute its plan without touching the bus
+        
+        Args:
+            target: Hotel identifier, 'home', or angle in degrees
+            
+        Returns:
+            dict: Plan from estimate_move() plus the direction of the first
+                leg (+1/-1/0 in motor ticks), starting from the last known
+                position
+        """
+        # Assume home when the position has never been read
+        from_angle = self.last_position
+        if from_angle is None:
+            from_angle = 0.0
+            
+        plan = self.estimate_move(target, from_angle)
+        first = plan['goal_angle'] if plan['lead_in'] is None else plan['lead_in']
+        plan['direction'] = (first > from_angle) - (first < from_angle)
+        plan['assumed_start'] = self.last_position is None
+        return plan
         
-    def activate_hotel(self, hotel, tolerance=None, timeout=None):
+    def activate_hotel(self, hotel, tolerance=None, timeout=None, dry_run=False, cancel=None):
         """
         Rotate resort to activate specified hotel
         
@@ -97,9 +342,12 @@ class PlateResort:
             hotel: Hotel identifier (e.g., from hotels list)
             tolerance: Position tolerance in degrees (uses config default if None)
             timeout: Maximum wait time in seconds (uses config default if None)
+            dry_run: Return the move plan from plan_move() instead of moving
+            cancel: threading.Event that abandons the wait when set
             
         Returns:
             bool: True if position reached within tolerance, False if timeout
+                or cancelled
         """
         if tolerance is None:
             tolerance = self.config['position_tolerance']
@@ -107,18 +355,27 @@ class PlateResort:
             timeout = self.config['movement_timeout']
         if hotel not in self.hotels:
             raise ValueError(f"Hotel {hotel} not found. Available: {self.hotels}")
+        if dry_run:
+            return self.plan_move(hotel)
             
         if self.port is None:
             raise Exception("Not connected. Call connect() first.")
             
         target_angle = self.hotel_angles[hotel]
-        goal_pos = int(target_angle * self.MAX_POSITION / self.MAX_ANGLE)
+        goal_pos = self.hotel_ticks[hotel]
+        start_pos, start_key = self.get_current_position(), self.current_hotel
+        
+        calibration = self.calibration.get(hotel)
+        if calibration:
+            goal_pos = self._clamp(goal_pos + calibration['offset'])
+            if not self._lead_in(target_angle, calibration['direction'], timeout, cancel):
+                print(f"✗ Approach to hotel {hotel} did not complete")
+                return False
         
         self.packet_handler.write4ByteTxRx(self.port, self.motor_id, self.ADDR_GOAL_POSITION, goal_pos)
         print(f"Moving to hotel {hotel} at {target_angle}° (position {goal_pos})")
         
         # Wait for position to be reached
-        import time
         start_time = time.time()
         min_error = float('inf')
         
@@ -129,24 +386,185 @@ class PlateResort:
             
             if error <= tolerance:
                 self.current_hotel = hotel
+                self.estimator.observe(start_pos, target_angle, time.time() - start_time, start_key, hotel)
                 print(f"✓ Hotel {hotel} activated! Position: {current_pos:.1f}° (error: {error:.2f}°)")
                 return True
                 
-            time.sleep(0.1)
+            if cancel is None:
+                time.sleep(0.1)
+            elif cancel.wait(0.1):
+                print(f"✗ Move to hotel {hotel} cancelled at {current_pos:.1f}°")
+                return False
             
         print(f"✗ Timeout waiting for hotel {hotel}. Current: {self.get_current_position():.1f}°, Min error achieved: {min_error:.2f}°")
         return False
         
-    def go_home(self):
-        """Go to home position (0 degrees)"""
+    def _clamp(self, position):
+        """Limit a goal position to the motor's range"""
+        return min(max(int(position), 0), self.MAX_POSITION)
+        
+    def _lead_in(self, target_angle, direction, timeout, cancel=None):
+        """
+        Make sure the final move towards target_angle runs in direction
+        
+        If the resort sits on the other side of the target, it first moves
+        calibration_approach degrees past it so gear backlash is taken up the
+        same way as when the hotel was calibrated.
+        
+        Returns:
+            bool: False on timeout or cancel
+        """
+        approach = self.config.get('calibration_approach', 5.0)
+        lead_angle = self._lead_in_angle(target_angle, direction, self.last_position)
+        if lead_angle is None:
+            return True
+        lead = self._clamp(self.angle_to_position(lead_angle))
+        self.packet_handler.write4ByteTxRx(self.port, self.motor_id, self.ADDR_GOAL_POSITION, lead)
+        start_time = time.time()
+        while time.time() - start_time < timeout:
+            if (target_angle - self.get_current_position()) * direction >= approach / 2:
+                return True
+            if cancel is None:
+                time.sleep(0.05)
+            elif cancel.wait(0.05):
+                return False
+        return False
+        
+    def _lead_in_angle(self, target_angle, direction, from_angle):
+        """Angle _lead_in() first moves to from from_angle, None if no lead-in is needed"""
+        approach = self.config.get('calibration_approach', 5.0)
+        if (target_angle - from_angle) * direction >= approach / 2:
+            return None
+        return min(max(target_angle - direction * approach, 0), self.MAX_ANGLE)
+        
+    def _settle(self, timeout, window=None, cancel=None):
+        """
+        Wait until the position stops changing
+        
+        Args:
+            timeout: Maximum wait in seconds
+            window: Seconds the position must stay within one tick
+                (config 'calibration_settle' if None)
+            cancel: threading.Event that aborts the wait when set
+            
+        Returns:
+            tuple: (settled position in degrees, seconds waited)
+        """
+        if window is None:
+            window = self.config.get('calibration_settle', 0.3)
+        tick = self.MAX_ANGLE / self.MAX_POSITION
+        start_time = time.time()
+        position = self.get_current_position()
+        still_since = start_time
+        while time.time() - start_time < timeout:
+            if cancel is None:
+                time.sleep(0.02)
+            elif cancel.wait(0.02):
+                raise Exception(f"Cancelled while settling at {position:.2f}°")
+            current = self.get_current_position()
+            if abs(current - position) > tick:
+                position, still_since = current, time.time()
+            elif time.time() - still_since >= window:
+                return current, still_since - start_time
+        raise Exception(f"Position did not settle within {timeout}s (at {position:.2f}°)")
+        
+    def calibrate_hotel(self, hotel, repeats=1, timeout=None, cancel=None):
+        """
+        Measure where the resort settles at a hotel from both directions
+        
+        The motor is sent calibration_approach degrees below the hotel, then
+        to the hotel's nominal goal position, and the same from above;
+        settled positions give the error per direction and their difference
+        the backlash.
+        
+        Args:
+            hotel: Hotel identifier
+            repeats: Approaches per direction, averaged
+            timeout: Seconds allowed per move to settle (movement_timeout if None)
+            cancel: threading.Event that aborts calibration when set
+            
+        Returns:
+            dict: Calibration entry, also stored in self.calibration: tick
+                'offset' to add to the goal position, approach 'direction'
+                (+1 increasing angle, -1 decreasing), 'backlash' and
+                per-direction errors in degrees, and mean 'settle_time'
+        """
+        if hotel not in self.hotels:
+            raise ValueError(f"Hotel {hotel} not found. Available: {self.hotels}")
         if self.port is None:
             raise Exception("Not connected. Call connect() first.")
+        if timeout is None:
+            timeout = self.config['movement_timeout']
             
+        target_angle = self.hotel_angles[hotel]
+        goal_pos = self.hotel_ticks[hotel]
+        approach = self.config.get('calibration_approach', 5.0)
+        self.current_hotel = None
+        
+        errors = {1: [], -1: []}
+        settle_times = {1: [], -1: []}
+        for _ in range(repeats):
+            for direction in (1, -1):
+                start_angle = target_angle - direction * approach
+                if not 0 <= start_angle <= self.MAX_ANGLE:
+                    continue  # No room to approach from this side
+                self.packet_handler.write4ByteTxRx(self.port, self.motor_id, self.ADDR_GOAL_POSITION,
+                                                   self.angle_to_position(start_angle))
+                self._settle(timeout, cancel=cancel)
+                self.packet_handler.write4ByteTxRx(self.port, self.motor_id, self.ADDR_GOAL_POSITION, goal_pos)
+                position, settle_time = self._settle(timeout, cancel=cancel)
+                errors[direction].append(position - target_angle)
+                settle_times[direction].append(settle_time)
+                
+        measured = [d for d in (1, -1) if errors[d]]
+        if not measured:
+            raise ValueError(f"Hotel {hotel} cannot be approached {approach}° from either side")
+        mean = {d: sum(errors[d]) / len(errors[d]) for d in measured}
+        spread = {d: max(errors[d]) - min(errors[d]) for d in measured}
+        # Most repeatable side, then the one needing the smaller correction
+        direction = min(measured, key=lambda d: (spread[d], abs(mean[d])))
+        
+        entry = {
+            'goal_position': goal_pos,
+            'offset': -round(mean[direction] * self.MAX_POSITION / self.MAX_ANGLE),
+            'direction': direction,
+            'backlash': abs(mean[1] - mean[-1]) if len(measured) == 2 else None,
+            'error_up': mean.get(1),
+            'error_down': mean.get(-1),
+            'settle_time': sum(settle_times[direction]) / len(settle_times[direction]),
+        }
+        self.calibration[hotel] = entry
+        backlash = "n/a" if entry['backlash'] is None else f"{entry['backlash']:.2f}°"
+        print(f"✓ Hotel {hotel} calibrated: offset {entry['offset']} ticks approaching from "
+              f"{'above' if direction < 0 else 'below'}, backlash {backlash}")
+        return entry
+        
+    def calibrate(self, hotels=None, repeats=1, cancel=None):
+        """
+        Calibrate several hotels (all if None) with calibrate_hotel()
+        
+        Returns:
+            dict: hotel -> calibration entry
+        """
+        return {hotel: self.calibrate_hotel(hotel, repeats, cancel=cancel)
+                for hotel in hotels or self.hotels}
+        
+    def go_home(self, dry_run=False, cancel=None):
+        """
+        Go to home position (0 degrees), or return its plan if dry_run
+        
+        A set cancel event (threading.Event) abandons the wait for the position.
+        """
+        if dry_run:
+            return self.plan_move('home')
+        if self.port is None:
+            raise Exception("Not connected. Call connect() first.")
+            
+        start_pos, start_key = self.get_current_position(), self.current_hotel
         print("Moving to home position (0°)")
         self.packet_handler.write4ByteTxRx(self.port, self.motor_id, self.ADDR_GOAL_POSITION, 0)
         
         # Wait for position to be reached
-        import time
         start_time = time.time()
         timeout = self.config.get('movement_timeout', 20)
         tolerance = self.config.get('position_tolerance', 0.5)
@@ -157,27 +575,39 @@ class PlateResort:
             
             if error <= tolerance:
                 self.current_hotel = None
+                self.estimator.observe(start_pos, 0.0, time.time() - start_time, start_key, 'home')
                 print(f"✓ Home position reached! Position: {current_pos:.1f}°")
                 return True
                 
-            time.sleep(0.1)
+            if cancel is None:
+                time.sleep(0.1)
+            elif cancel.wait(0.1):
+                print(f"✗ Move home cancelled at {current_pos:.1f}°")
+                return False
             
         print(f"✗ Timeout waiting for home position. Current: {self.get_current_position():.1f}°")
         return False
         
-    def move_to_angle(self, angle):
-        """Move to specific angle in degrees"""
+    def move_to_angle(self, angle, dry_run=False, cancel=None):
+        """
+        Move to specific angle in degrees, or return its plan if dry_run
+        
+        A set cancel event (threading.Event) abandons the wait for the position.
+        """
+        # Convert angle to motor position
+        goal_pos = self.angle_to_position(angle)
+        if dry_run:
+            return self.plan_move(angle)
         if self.port is None:
             raise Exception("Not connected. Call connect() first.")
-            
-        # Convert angle to motor position
-        goal_pos = int(angle * self.MAX_POSITION / self.MAX_ANGLE)
+        
+        start_pos, start_key = self.get_current_position(), self.current_hotel
+        self.current_hotel = None
         
         print(f"Moving to {angle}°")
         self.packet_handler.write4ByteTxRx(self.port, self.motor_id, self.ADDR_GOAL_POSITION, goal_pos)
         
         # Wait for position to be reached
-        import time
         start_time = time.time()
         timeout = self.config.get('movement_timeout', 20)
         tolerance = self.config.get('position_tolerance', 0.5)
@@ -187,21 +617,33 @@ class PlateResort:
             error = abs(current_pos - angle)
             
             if error <= tolerance:
+                self.estimator.observe(start_pos, angle, time.time() - start_time, start_key)
                 print(f"✓ Target position reached! Position: {current_pos:.1f}°")
                 return True
                 
-            time.sleep(0.1)
+            if cancel is None:
+                time.sleep(0.1)
+            elif cancel.wait(0.1):
+                print(f"✗ Move to {angle}° cancelled at {current_pos:.1f}°")
+                return False
             
         print(f"✗ Timeout waiting for target position. Current: {self.get_current_position():.1f}°")
         return False
         
     def emergency_stop(self):
-        """Emergency stop - disable torque immediately"""
+        """
+        Emergency stop - disable torque immediately
+        
+        May be called from another thread while a move polls the bus; the
+        write waits for at most the transaction in progress.
+        """
         if self.port is None:
             raise Exception("Not connected. Call connect() first.")
             
         print("🛑 EMERGENCY STOP - Disabling torque")
-        self.packet_handler.write1ByteTxRx(self.port, self.motor_id, self.ADDR_TORQUE_ENABLE, 0)
+        result, _ = self.packet_handler.write1ByteTxRx(self.port, self.motor_id, self.ADDR_TORQUE_ENABLE, 0)
+        if result != COMM_SUCCESS:
+            raise Exception(f"Emergency stop failed: {self.packet_handler.getTxRxResult(result)}")
         return True
         
     def get_active_hotel(self):
@@ -269,21 +711,24 @@ class PlateResort:
         # Position feedback
         health['position'] = self.get_current_position()
         
-        # Health warnings
-        health['warnings'] = []
+        health['warnings'] = self.health_warnings(health)
+        return health
+        
+    def health_warnings(self, health):
+        """List warnings for health readings outside configured limits"""
+        warnings = []
         if health['temperature'] and health['temperature'] > self.config['temperature_limit']:
-            health['warnings'].append(f"High temperature: {health['temperature']}°C")
+            warnings.append(f"High temperature: {health['temperature']}°C")
         if health['current'] and abs(health['current']) > self.config['current_limit']:
-            health['warnings'].append(f"High current: {health['current']:.0f}mA")
+            warnings.append(f"High current: {health['current']:.0f}mA")
         if health['voltage']:
             if health['voltage'] < self.config['voltage_min']:
-                health['warnings'].append(f"Low voltage: {health['voltage']:.1f}V")
+                warnings.append(f"Low voltage: {health['voltage']:.1f}V")
             elif health['voltage'] > self.config['voltage_max']:
-                health['warnings'].append(f"High voltage: {health['voltage']:.1f}V")
+                warnings.append(f"High voltage: {health['voltage']:.1f}V")
         if health['hardware_error'] and health['hardware_error'] > 0:
-            health['warnings'].append(f"Hardware error: 0x{health['hardware_error']:02X}")
-            
-        return health
+            warnings.append(f"Hardware error: 0x{health['hardware_error']:02X}")
+        return warnings
         
     def print_motor_health(self):
         """Print formatted motor health status"""
@@ -306,8 +751,132 @@ class PlateResort:
     def set_speed(self, speed):
         """Set motor speed (profile velocity)"""
         self.speed = speed
+        self.estimator.velocity = speed
         if self.port:
-            self.packet_handler.write4ByteTxRx(self.port, self.motor_id, 112, speed)
+            self.packet_handler.write4ByteTxRx(self.port, self.motor_id, self.ADDR_PROFILE_VELOCITY, speed)
+            
+    def estimate_move(self, target, from_angle=None):
+        """
+        Predict how long a move will take without moving
+        
+        Args:
+            target: Hotel identifier, 'home', or angle in degrees
+            from_angle: Start angle in degrees (current position if None)
+            
+        Returns:
+            dict: Target, nominal target angle, calibrated goal position and
+                angle, lead-in angle (None without one), distance in degrees
+                over every leg and duration in seconds
+        """
+        if target == 'home':
+            target_angle = 0.0
+        elif isinstance(target, str):
+            if target not in self.hotels:
+                raise ValueError(f"Hotel {target} not found. Available: {self.hotels}")
+            target_angle = self.hotel_angles[target]
+        else:
+            target_angle = float(target)
+            target = None
+            if not 0 <= target_angle <= self.MAX_ANGLE:
+                raise ValueError(f"Angle {target_angle} out of range (0-{self.MAX_ANGLE:.0f}°)")
+            
+        from_key = self.current_hotel
+        if from_angle is None:
+            from_angle = self.get_current_position() if self.port else self.last_position
+        if from_angle is None:
+            raise Exception("Current position unknown. Call connect() first.")
+            
+        lead_in = None
+        goal_pos, goal_angle = self.angle_to_position(target_angle), target_angle
+        calibration = self.calibration.get(target)
+        if calibration:
+            goal_pos = self._clamp(goal_pos + calibration['offset'])
+            goal_angle = goal_pos * self.MAX_ANGLE / self.MAX_POSITION
+            lead_in = self._lead_in_angle(target_angle, calibration['direction'], from_angle)
+        
+        if lead_in is None:
+            distance = abs(goal_angle - from_angle)
+            duration = self.estimator.estimate(from_angle, goal_angle, from_key, target)
+        else:
+            distance = abs(lead_in - from_angle) + abs(goal_angle - lead_in)
+            duration = (self.estimator.estimate(from_angle, lead_in)
+                        + self.estimator.estimate(lead_in, goal_angle, from_key, target))
+        return {
+            'target': target,
+            'target_angle': target_angle,
+            'goal_position': goal_pos,
+            'goal_angle': goal_angle,
+            'lead_in': lead_in,
+            'from_angle': from_angle,
+            'distance': distance,
+            'duration': duration,
+        }
+        
+    def hotel_costs(self):
+        """
+        Expected rotation in degrees to reach each hotel from the usual
+        working position, weighted by how often each hotel is visited
+        """
+        hits = self.inventory.hotel_hits
+        total = sum(hits[h] + 1 for h in self.hotels)
+        return {
+            hotel: sum(
+                (hits[other] + 1) / total * abs(self.hotel_angles[hotel] - self.hotel_angles[other])
+                for other in self.hotels
+            )
+            for hotel in self.hotels
+        }
+        
+    def recommend_slot(self, plate_id=None):
+        """Recommend a (hotel, room) for a plate to minimise expected rotation"""
+        return self.inventory.recommend(self.hotel_costs(), plate_id)
+        
+    def rebalance_plan(self):
+        """Plan plate moves placing frequently accessed plates in the cheapest hotels"""
+        return self.inventory.rebalance(self.hotel_costs())
+        
+    def plan_visits(self, hotels, from_angle=None):
+        """
+        Order hotel visits to minimise total rotation
+        
+        The carousel never wraps past 0°/360°, so the shortest tour sweeps
+        from the nearer extreme hotel to the farther one.
+        
+        Args:
+            hotels: Hotels to visit (duplicates are visited once)
+            from_angle: Start angle in degrees (last known position if None)
+            
+        Returns:
+            list: Hotels in visit order
+        """
+        for hotel in hotels:
+            if hotel not in self.hotels:
+                raise ValueError(f"Hotel {hotel} not found. Available: {self.hotels}")
+        if from_angle is None:
+            from_angle = self.last_position if self.last_position is not None else 0.0
+            
+        order = sorted(set(hotels), key=lambda h: self.hotel_angles[h])
+        if not order:
+            return order
+        low, high = self.hotel_angles[order[0]], self.hotel_angles[order[-1]]
+        if abs(from_angle - high) < abs(from_angle - low):
+            order.reverse()
+        return order
+        
+    def estimate(self, targets):
+        """
+        Predict move durations from the current position
+        
+        Args:
+            targets: A target or list of targets (hotel, 'home' or angle)
+            
+        Returns:
+            list: One estimate_move() result per target
+        """
+        if not isinstance(targets, (list, tuple)):
+            targets = [targets]
+        from_angle = self.get_current_position() if self.port else self.last_position
+        return [self.estimate_move(target, from_angle) for target in targets]
             
     def get_current_position(self):
         """Get current motor position in degrees"""
@@ -317,6 +886,7 @@ class PlateResort:
         pos, result, error = self.packet_handler.read4ByteTxRx(self.port, self.motor_id, self.ADDR_PRESENT_POSITION)
         if result == 0 and error == 0:
             angle = pos * self.MAX_ANGLE / self.MAX_POSITION
+            self.last_position = angle
             return angle
         else:
             raise Exception("Failed to read position")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Move duration estimation for the plate resort carousel
+"""
+import math
+
+# Dynamixel X-series profile units
+VELOCITY_UNIT = 0.229  # rev/min per profile velocity step
+ACCELERATION_UNIT = 214.577  # rev/min² per profile acceleration step
+VELOCITY_LIMIT = 265  # Default velocity limit register (X-series)
+
+
+class MoveEstimator:
+    def __init__(self, velocity, acceleration=0, settle_time=0.2, learning_rate=0.2,
+                 max_velocity=VELOCITY_LIMIT):
+        """
+        Predict move durations from the motor's trapezoidal velocity profile
+
+        Args:
+            velocity: Profile velocity register value (0 = no limit, so
+                max_velocity)
+            acceleration: Profile acceleration register value (0 = instant)
+            settle_time: Seconds added per move for settling and polling
+            learning_rate: Weight of each observed move in the corrections
+            max_velocity: Velocity limit register value the motor runs at
+                when the profile velocity is 0
+        """
+        self.velocity = velocity
+        self.acceleration = acceleration
+        self.settle_time = settle_time
+        self.learning_rate = learning_rate
+        self.max_velocity = max_velocity
+        # Observed / predicted ratios keyed by (from, to) target, plus None overall
+        self.corrections = {}
+
+    def profile_time(self, distance):
+        """Seconds to travel distance degrees under the velocity profile"""
+        velocity = self.velocity if self.velocity > 0 else self.max_velocity
+        velocity *= VELOCITY_UNIT * 6.0  # deg/s
+        if distance <= 0:
+            return 0.0
+        if not self.acceleration:
+            return distance / velocity
+
+        acceleration = self.acceleration * ACCELERATION_UNIT / 10.0  # deg/s²
+        if distance >= velocity ** 2 / acceleration:
+            return distance / velocity + velocity / acceleration
+        return 2.0 * math.sqrt(distance / acceleration)
+
+    def estimate(self, from_angle, to_angle, from_key=None, to_key=None):
+        """
+        Predict seconds to move between two angles
+
+        Args:
+            from_angle: Start angle in degrees
+            to_angle: Target angle in degrees
+            from_key: Start target (e.g. hotel) for learned corrections
+            to_key: End target (e.g. hotel) for learned corrections
+
+        Returns:
+            float: Predicted duration in seconds
+        """
+        correction = self.corrections.get((from_key, to_key), self.corrections.get(None, 1.0))
+        return self.profile_time(abs(to_angle - from_angle)) * correction + self.settle_time
+
+    def observe(self, from_angle, to_angle, duration, from_key=None, to_key=None):
+        """Update learned corrections from a completed move"""
+        predicted = self.profile_time(abs(to_angle - from_angle))
+        if predicted <= 0:
+            return
+        ratio = max(duration - self.settle_time, 0.0) / predicted
+        for key in (None, (from_key, to_key)):
+            previous = self.corrections.get(key)
+            if previous is None:
+                self.corrections[key] = ratio
+            else:
+                self.corrections[key] = previous + self.learning_rate * (ratio - previous)
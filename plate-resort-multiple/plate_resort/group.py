@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Several plate resort motors sharing one Dynamixel bus
+"""
+from dynamixel_sdk import PortHandler, GroupSyncRead, GroupSyncWrite, COMM_SUCCESS
+import time
+
+from .core import PlateResort
+
+# Health block read in one sync read: hardware error status (70) .. present
+# temperature (146), including present current (126) and position (132)
+HEALTH_START = 70
+HEALTH_LENGTH = 77
+
+
+class ResortGroup:
+    def __init__(self, config_file="resort_config.yaml", motor_ids=None, **overrides):
+        """
+        Drive several resort motors on one port with sync reads and writes
+
+        Each motor is a PlateResort sharing the group's port handler, so
+        single-motor methods (activate_hotel, get_motor_health, ...) still
+        work on group.resorts[motor_id]; group methods command or poll every
+        motor in one bus transaction.
+
+        Args:
+            config_file: Path to YAML configuration file
+            motor_ids: Motor IDs on the bus (config 'motor_ids', or
+                'motor_id' alone, if None)
+            **overrides: Override any config values for every motor
+        """
+        if motor_ids is None:
+            config = PlateResort(config_file, **overrides).config
+            motor_ids = config.get('motor_ids') or [config['motor_id']]
+
+        self.resorts = {}
+        for motor_id in motor_ids:
+            self.resorts[motor_id] = PlateResort(config_file, **dict(overrides, motor_id=motor_id))
+        self.motor_ids = list(self.resorts)
+
+        first = self.resorts[self.motor_ids[0]]
+        self.device = first.device
+        self.baud = first.baud
+        self.port = None
+        self.packet_handler = None
+
+    def connect(self):
+        """Open the shared port and configure every motor"""
+        self.port = PortHandler(self.device)
+        self.packet_handler = self.resorts[self.motor_ids[0]].make_packet_handler()
+
+        if not self.port.openPort():
+            raise Exception(f"Failed to open port {self.device}")
+        if not self.port.setBaudRate(self.baud):
+            raise Exception(f"Failed to set baudrate {self.baud}")
+
+        for resort in self.resorts.values():
+            resort.connect(self.port, self.packet_handler)
+        print(f"✓ Connected {len(self.resorts)} motors on {self.device}: {self.motor_ids}")
+
+    def disconnect(self):
+        """Disable torque on every motor in one sync write and close the port"""
+        if self.port is None:
+            return
+        first = self.resorts[self.motor_ids[0]]
+        self._sync_write(first.ADDR_TORQUE_ENABLE, 1, {motor_id: 0 for motor_id in self.motor_ids})
+        self.port.closePort()
+        self.port = None
+        for resort in self.resorts.values():
+            resort.port = None
+
+    def _require_connection(self):
+        if self.port is None:
+            raise Exception("Not connected. Call connect() first.")
+
+    def _check_ids(self, motor_ids):
+        for motor_id in motor_ids:
+            if motor_id not in self.resorts:
+                raise ValueError(f"Motor {motor_id} not in group. Available: {self.motor_ids}")
+
+    def _sync_write(self, address, length, values):
+        """Write one register on several motors in a single packet"""
+        self._require_connection()
+        group = GroupSyncWrite(self.port, self.packet_handler, address, length)
+        for motor_id, value in values.items():
+            group.addParam(motor_id, list(int(value).to_bytes(length, 'little')))
+        result = group.txPacket()
+        if result != COMM_SUCCESS:
+            raise Exception(f"Sync write failed: {self.packet_handler.getTxRxResult(result)}")
+
+    def _sync_read(self, address, length, motor_ids=None):
+        """Read one register block from several motors in a single transaction"""
+        self._require_connection()
+        motor_ids = self.motor_ids if motor_ids is None else list(motor_ids)
+        group = GroupSyncRead(self.port, self.packet_handler, address, length)
+        for motor_id in motor_ids:
+            group.addParam(motor_id)
+        with self.packet_handler.lock:
+            # Sent and received in separate handler calls
+            result = group.txRxPacket()
+        if result != COMM_SUCCESS:
+            raise Exception(f"Sync read failed: {self.packet_handler.getTxRxResult(result)}")
+        return group
+
+    def set_goals(self, angles):
+        """
+        Send goal positions to several motors in one sync write
+
+        Args:
+            angles: Dict of motor_id -> angle in degrees
+        """
+        self._check_ids(angles)
+        goals = {
+            motor_id: self.resorts[motor_id].angle_to_position(angle)
+            for motor_id, angle in angles.items()
+        }
+        first = self.resorts[self.motor_ids[0]]
+        self._sync_write(first.ADDR_GOAL_POSITION, 4, goals)
+
+    def read_positions(self, motor_ids=None):
+        """
+        Read every motor's position in one sync read
+
+        Returns:
+            dict: motor_id -> angle in degrees
+        """
+        first = self.resorts[self.motor_ids[0]]
+        group = self._sync_read(first.ADDR_PRESENT_POSITION, 4, motor_ids)
+        positions = {}
+        for motor_id in group.data_dict:
+            resort = self.resorts[motor_id]
+            pos = group.getData(motor_id, resort.ADDR_PRESENT_POSITION, 4)
+            resort.last_position = pos * resort.MAX_ANGLE / resort.MAX_POSITION
+            positions[motor_id] = resort.last_position
+        return positions
+
+    def move_to_angles(self, angles, tolerance=None, timeout=None):
+        """
+        Move several motors together and wait for all to arrive
+
+        Args:
+            angles: Dict of motor_id -> angle in degrees
+            tolerance: Position tolerance in degrees (uses config default if None)
+            timeout: Maximum wait time in seconds (uses config default if None)
+
+        Returns:
+            dict: motor_id -> True if reached within tolerance, False if timeout
+        """
+        first = self.resorts[self.motor_ids[0]]
+        if tolerance is None:
+            tolerance = first.config['position_tolerance']
+        if timeout is None:
+            timeout = first.config['movement_timeout']
+
+        self.set_goals(angles)
+        print("Moving " + ", ".join(f"motor {i} to {a}°" for i, a in angles.items()))
+
+        start_time = time.time()
+        reached = {motor_id: False for motor_id in angles}
+        while time.time() - start_time < timeout:
+            waiting = [motor_id for motor_id, done in reached.items() if not done]
+            for motor_id, angle in self.read_positions(waiting).items():
+                reached[motor_id] = abs(angle - angles[motor_id]) <= tolerance
+            if all(reached.values()):
+                print(f"✓ All {len(reached)} motors in position")
+                return reached
+            time.sleep(0.1)
+
+        print(f"✗ Timeout waiting for motors {[i for i, done in reached.items() if not done]}")
+        return reached
+
+    def activate_hotels(self, hotels, tolerance=None, timeout=None):
+        """
+        Rotate several resorts to their hotels at the same time
+
+        Args:
+            hotels: Dict of motor_id -> hotel identifier
+
+        Returns:
+            dict: motor_id -> True if the hotel was reached
+        """
+        self._check_ids(hotels)
+        angles = {}
+        for motor_id, hotel in hotels.items():
+            resort = self.resorts[motor_id]
+            if hotel not in resort.hotels:
+                raise ValueError(f"Hotel {hotel} not found. Available: {resort.hotels}")
+            angles[motor_id] = resort.hotel_angles[hotel]
+
+        reached = self.move_to_angles(angles, tolerance, timeout)
+        for motor_id, ok in reached.items():
+            if ok:
+                self.resorts[motor_id].current_hotel = hotels[motor_id]
+        return reached
+
+    def get_health(self):
+        """
+        Read current, voltage, temperature and hardware errors for every
+        motor in one sync read
+
+        Returns:
+            dict: motor_id -> health dict as from PlateResort.get_motor_health()
+        """
+        block = self._sync_read(HEALTH_START, HEALTH_LENGTH)
+
+        health = {}
+        for motor_id, resort in self.resorts.items():
+            pos = block.getData(motor_id, resort.ADDR_PRESENT_POSITION, 4)
+            resort.last_position = pos * resort.MAX_ANGLE / resort.MAX_POSITION
+            current = block.getData(motor_id, resort.ADDR_PRESENT_CURRENT, 2)
+            if current > 32767:
+                current = current - 65536
+            motor = {
+                'temperature': block.getData(motor_id, resort.ADDR_PRESENT_TEMPERATURE, 1),
+                'current': current * 2.69,  # Convert to mA
+                'voltage': block.getData(motor_id, resort.ADDR_PRESENT_VOLTAGE, 2) * 0.1,
+                'hardware_error': block.getData(motor_id, resort.ADDR_HARDWARE_ERROR, 1),
+                'position': resort.last_position,
+            }
+            motor['warnings'] = resort.health_warnings(motor)
+            health[motor_id] = motor
+        return health
+
+    def emergency_stop(self):
+        """Emergency stop - disable torque on every motor in one packet"""
+        print("🛑 EMERGENCY STOP - Disabling torque on all motors")
+        first = self.resorts[self.motor_ids[0]]
+        self._sync_write(first.ADDR_TORQUE_ENABLE, 1, {motor_id: 0 for motor_id in self.motor_ids})
+        return True
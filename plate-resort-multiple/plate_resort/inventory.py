@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Room-level plate inventory for the plate resort
+"""
+import bisect
+import threading
+from collections import Counter, defaultdict
+
+
+class PlateInventory:
+    def __init__(self, hotels, rooms_per_hotel):
+        """
+        Track which plate occupies which (hotel, room) slot
+
+        Args:
+            hotels: Hotel identifiers
+            rooms_per_hotel: Number of rooms per hotel, numbered from 1
+        """
+        self.hotels = list(hotels)
+        self.rooms = rooms_per_hotel
+        self.lock = threading.Lock()
+        self._locations = {}  # plate_id -> (hotel, room)
+        self._slots = {}  # (hotel, room) -> plate_id
+        self._free = {hotel: list(range(1, rooms_per_hotel + 1)) for hotel in self.hotels}
+        self.plate_hits = Counter()
+        self.hotel_hits = Counter()
+        self.transitions = defaultdict(Counter)  # previous hotel -> next hotel counts
+        self.last_hotel = None
+
+    def _check_slot(self, hotel, room):
+        if hotel not in self._free:
+            raise ValueError(f"Hotel {hotel} not found. Available: {self.hotels}")
+        if room is not None and not 1 <= room <= self.rooms:
+            raise ValueError(f"Room {room} out of range (1-{self.rooms})")
+
+    def resize(self, hotels, rooms_per_hotel):
+        """
+        Switch to a new hotel list and room count, keeping every plate
+
+        Raises:
+            ValueError: If a stored plate's slot does not exist in the new layout
+        """
+        with self.lock:
+            orphaned = sorted(
+                plate_id for plate_id, (hotel, room) in self._locations.items()
+                if hotel not in hotels or room > rooms_per_hotel
+            )
+            if orphaned:
+                raise ValueError(f"Plates {orphaned} would be outside the new layout")
+            self.hotels = list(hotels)
+            self.rooms = rooms_per_hotel
+            self._free = {
+                hotel: [room for room in range(1, rooms_per_hotel + 1) if (hotel, room) not in self._slots]
+                for hotel in self.hotels
+            }
+
+    def place(self, plate_id, hotel, room=None):
+        """
+        Record a plate in a slot
+
+        Args:
+            plate_id: Plate ID or barcode
+            hotel: Hotel identifier
+            room: Room number (lowest free room in the hotel if None)
+
+        Returns:
+            tuple: (hotel, room) the plate was placed in
+        """
+        with self.lock:
+            self._check_slot(hotel, room)
+            if plate_id in self._locations:
+                raise ValueError(f"Plate {plate_id} already in {self._locations[plate_id]}")
+            free = self._free[hotel]
+            if room is None:
+                if not free:
+                    raise ValueError(f"Hotel {hotel} is full")
+                room = free[0]
+            elif (hotel, room) in self._slots:
+                raise ValueError(f"Slot ({hotel}, {room}) holds plate {self._slots[(hotel, room)]}")
+
+            free.pop(bisect.bisect_left(free, room))
+            self._locations[plate_id] = (hotel, room)
+            self._slots[(hotel, room)] = plate_id
+            return hotel, room
+
+    def remove(self, plate_id):
+        """Remove a plate and return the (hotel, room) it occupied"""
+        with self.lock:
+            hotel, room = self._locations.pop(plate_id)
+            del self._slots[(hotel, room)]
+            bisect.insort(self._free[hotel], room)
+            return hotel, room
+
+    def locate(self, plate_id):
+        """Return the (hotel, room) holding a plate, raising KeyError if absent"""
+        return self._locations[plate_id]
+
+    def plate_at(self, hotel, room):
+        """Return the plate in a slot, or None if it is free"""
+        self._check_slot(hotel, room)
+        return self._slots.get((hotel, room))
+
+    def free_slots(self, hotel=None):
+        """List free (hotel, room) slots, optionally for one hotel"""
+        with self.lock:
+            hotels = self.hotels if hotel is None else [hotel]
+            for h in hotels:
+                self._check_slot(h, None)
+            return [(h, room) for h in hotels for room in self._free[h]]
+
+    def find_free(self, hotels=None):
+        """
+        Find the first free slot
+
+        Args:
+            hotels: Hotels to search in order of preference (all if None)
+
+        Returns:
+            tuple: (hotel, room), or None if every searched hotel is full
+        """
+        with self.lock:
+            for hotel in hotels or self.hotels:
+                self._check_slot(hotel, None)
+                if self._free[hotel]:
+                    return hotel, self._free[hotel][0]
+            return None
+
+    def record_access(self, hotel=None, plate_ids=()):
+        """Count a visit to a hotel and/or the plates it was made for"""
+        with self.lock:
+            if hotel is not None:
+                self.hotel_hits[hotel] += 1
+                if self.last_hotel is not None and self.last_hotel != hotel:
+                    self.transitions[self.last_hotel][hotel] += 1
+                self.last_hotel = hotel
+            self.plate_hits.update(plate_ids)
+
+    def predict_next(self, hotel, min_observations=5):
+        """
+        Predict the next hotel requested after hotel from observed transitions
+
+        Returns:
+            tuple: (hotel, probability), or None with too few observations
+        """
+        with self.lock:
+            counts = self.transitions.get(hotel)
+            total = sum(counts.values()) if counts else 0
+            if total < min_observations:
+                return None
+            best, count = counts.most_common(1)[0]
+            return best, count / total
+
+    def recommend(self, costs, plate_id=None):
+        """
+        Recommend a free slot for a new or returning plate
+
+        Plates are ranked by access count and the most accessed fill the
+        cheapest hotels first; the plate goes to the hotel its rank maps to,
+        or the nearest hotel in cost order with a free room.
+
+        Args:
+            costs: Expected rotation in degrees to reach each hotel
+            plate_id: Plate to place (treated as never accessed if unknown)
+
+        Returns:
+            tuple: (hotel, room), or None if the resort is full
+        """
+        with self.lock:
+            order = sorted(self.hotels, key=lambda h: costs[h])
+            hits = self.plate_hits[plate_id] if plate_id is not None else 0
+            rank = sum(1 for p in self._locations if p != plate_id and self.plate_hits[p] > hits)
+            ideal = min(rank // self.rooms, len(order) - 1)
+            for i in sorted(range(len(order)), key=lambda i: (abs(i - ideal), i)):
+                if self._free[order[i]]:
+                    return order[i], self._free[order[i]][0]
+            return None
+
+    def rebalance(self, costs):
+        """
+        Plan plate moves so the most accessed plates sit in the cheapest hotels
+
+        Accessed plates are ranked by access count and fill hotels in cost
+        order; never-accessed plates only move when evicted to make room, and
+        then go to the most expensive hotel with a free room.
+
+        Args:
+            costs: Expected rotation in degrees to reach each hotel
+
+        Returns:
+            dict: Ordered moves, plates that could not be moved for lack of a
+                free room, and access-weighted rotation before and after
+        """
+        with self.lock:
+            order = sorted(self.hotels, key=lambda h: costs[h])
+            where = dict(self._locations)
+            free = {h: list(rooms) for h, rooms in self._free.items()}
+            hot = sorted(
+                (p for p in where if self.plate_hits[p]),
+                key=lambda p: (-self.plate_hits[p], costs[where[p][0]]),
+            )
+            target = {p: order[min(i // self.rooms, len(order) - 1)] for i, p in enumerate(hot)}
+
+            def weighted():
+                return sum(self.plate_hits[p] * costs[where[p][0]] for p in where)
+
+            before = weighted()
+            moves = []
+            unresolved = []
+
+            def move(plate_id, hotel, evicted=False):
+                from_hotel, from_room = where[plate_id]
+                room = free[hotel].pop(0)
+                bisect.insort(free[from_hotel], from_room)
+                where[plate_id] = (hotel, room)
+                moves.append({"plate_id": plate_id, "from": [from_hotel, from_room],
+                              "to": [hotel, room], "evicted": evicted})
+
+            for plate_id in hot:
+                hotel = target[plate_id]
+                if where[plate_id][0] == hotel:
+                    continue
+                if not free[hotel]:
+                    # Evict the least accessed plate not meant to stay here
+                    victim = min(
+                        (q for q in where if where[q][0] == hotel and target.get(q) != hotel),
+                        key=lambda q: self.plate_hits[q],
+                    )
+                    spare = [h for h in reversed(order) if free[h] and h != hotel]
+                    if not spare:
+                        unresolved.append(plate_id)
+                        continue
+                    move(victim, spare[0], evicted=True)
+                move(plate_id, hotel)
+
+            return {
+                "moves": moves,
+                "unresolved": unresolved,
+                "expected_rotation_before": before,
+                "expected_rotation_after": weighted(),
+            }
+
+    def plates(self):
+        """Return a copy of the plate_id -> (hotel, room) map"""
+        with self.lock:
+            return dict(self._locations)
+
+    def __len__(self):
+        return len(self._locations)
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Native Dynamixel Protocol 2.0 packet handler
+
+Drop-in replacement for dynamixel_sdk's PacketHandler(2.0) covering the
+instructions the resort uses (ping, read, write, sync/bulk read/write,
+reboot). Instruction packets are encoded into a preallocated bytearray,
+CRC-16 is table driven over memoryviews and status packets are parsed in
+place in a preallocated receive buffer. Anything not implemented here
+(fast sync read, reg write, factory reset, ...) falls back to the SDK.
+
+LockedPacketHandler wraps either handler so threads sharing a bus take
+turns one transaction at a time.
+"""
+import struct
+import threading
+
+from dynamixel_sdk import Protocol2PacketHandler
+from dynamixel_sdk.robotis_def import (
+    BROADCAST_ID, MAX_ID, COMM_SUCCESS, COMM_PORT_BUSY, COMM_TX_FAIL,
+    COMM_TX_ERROR, COMM_RX_TIMEOUT, COMM_RX_CORRUPT, COMM_NOT_AVAILABLE,
+)
+
+INST_PING = 0x01
+INST_READ = 0x02
+INST_WRITE = 0x03
+INST_REBOOT = 0x08
+INST_STATUS = 0x55
+INST_SYNC_READ = 0x82
+INST_SYNC_WRITE = 0x83
+INST_BULK_READ = 0x92
+INST_BULK_WRITE = 0x93
+
+HEADER = b"\xff\xff\xfd\x00"
+STUFFING = b"\xff\xff\xfd"
+STUFFED = b"\xff\xff\xfd\xfd"
+STATUS_MIN_LENGTH = 11  # Header(4) ID LEN_L LEN_H INST ERR CRC_L CRC_H
+PING_STATUS_LENGTH = 14  # Minimum status plus model number(2) and firmware(1)
+BUFFER_SIZE = 4096  # Fits a broadcast ping answered by every ID
+
+
+def _make_crc_table():
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = (crc << 1) ^ 0x8005 if crc & 0x8000 else crc << 1
+        table.append(crc & 0xFFFF)
+    return tuple(table)
+
+
+CRC_TABLE = _make_crc_table()
+
+
+def crc16(data, crc=0):
+    """Dynamixel CRC-16 (polynomial 0x8005) of a bytes-like object or memoryview"""
+    table = CRC_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+class NativePacketHandler(Protocol2PacketHandler):
+    """
+    Protocol 2.0 packet handler with preallocated buffers
+
+    Like the SDK handler it is not thread-safe; callers serialise access
+    per port. Read data returned by readTxRx/readRx is copied out of the
+    receive buffer, while the 1/2/4-byte reads decode straight from it.
+    """
+
+    def __init__(self):
+        self._tx = bytearray(BUFFER_SIZE)
+        self._tx[0:4] = HEADER
+        self._tx_view = memoryview(self._tx)
+        self._rx = bytearray(BUFFER_SIZE)
+        self._rx_view = memoryview(self._rx)
+
+    # Encoding
+
+    def _begin(self, dxl_id, instruction):
+        self._tx[4] = dxl_id
+        self._tx[7] = instruction
+
+    def _send(self, port, param_length):
+        """Frame the packet whose parameters were written at offset 8 and transmit it"""
+        if port.is_using:
+            return COMM_PORT_BUSY
+        end = 8 + param_length
+        if end + 2 > BUFFER_SIZE:
+            return COMM_TX_ERROR
+
+        tx = self._tx
+        if tx.find(STUFFING, 7, end) != -1:
+            # Rare: the payload contains the header pattern (copies once)
+            stuffed = bytes(self._tx_view[7:end]).replace(STUFFING, STUFFED)
+            if 7 + len(stuffed) + 2 > BUFFER_SIZE:
+                return COMM_TX_ERROR
+            tx[7:7 + len(stuffed)] = stuffed
+            end = 7 + len(stuffed)
+
+        struct.pack_into("<H", tx, 5, end - 5)  # Instruction, parameters and CRC
+        struct.pack_into("<H", tx, end, crc16(self._tx_view[:end]))
+
+        port.is_using = True
+        port.clearPort()
+        if port.writePort(self._tx_view[:end + 2]) != end + 2:
+            port.is_using = False
+            return COMM_TX_FAIL
+        return COMM_SUCCESS
+
+    def _put_params(self, offset, param, param_length):
+        """Copy caller-built parameters (list or bytes) into the tx buffer"""
+        if 8 + offset + param_length + 2 > BUFFER_SIZE:
+            return False
+        self._tx[8 + offset:8 + offset + param_length] = bytes(param[:param_length])
+        return True
+
+    # Decoding
+
+    def _fill(self, port, size, count):
+        """Append up to count bytes from the port to the rx buffer"""
+        data = port.readPort(count)
+        n = len(data)
+        self._rx[size:size + n] = data
+        return size + n
+
+    def _receive(self, port):
+        """
+        Read one status packet into the start of the rx buffer
+
+        Returns:
+            tuple: (result, id, error, parameters memoryview)
+        """
+        rx, view = self._rx, self._rx_view
+        size = 0
+        wait = STATUS_MIN_LENGTH
+        result = COMM_RX_TIMEOUT
+        while True:
+            if size < wait:
+                size = self._fill(port, size, wait - size)
+                if size < wait:
+                    if port.isPacketTimeout():
+                        result = COMM_RX_TIMEOUT if size == 0 else COMM_RX_CORRUPT
+                        break
+                    continue
+
+            idx = rx.find(HEADER, 0, size)
+            if idx != 0:
+                # Drop noise before the header, keeping a possible partial header
+                idx = idx if idx > 0 else max(size - 3, 1)
+                rx[0:size - idx] = rx[idx:size]
+                size -= idx
+                continue
+
+            length = rx[5] | rx[6] << 8
+            if rx[4] > MAX_ID or rx[7] != INST_STATUS or length < 4 or 7 + length > BUFFER_SIZE:
+                rx[0:size - 1] = rx[1:size]
+                size -= 1
+                continue
+            if size < 7 + length:
+                wait = 7 + length
+                continue
+
+            total = 7 + length
+            if crc16(view[:total - 2]) != (rx[total - 2] | rx[total - 1] << 8):
+                result = COMM_RX_CORRUPT
+                break
+
+            end = total - 2
+            if rx.find(STUFFED, 7, end) != -1:
+                unstuffed = bytes(view[7:end]).replace(STUFFED, STUFFING)
+                rx[7:7 + len(unstuffed)] = unstuffed
+                end = 7 + len(unstuffed)
+            port.is_using = False
+            return COMM_SUCCESS, rx[4], rx[8], view[9:end]
+
+        port.is_using = False
+        return result, None, 0, None
+
+    def _receive_from(self, port, dxl_id):
+        """Read status packets until one from dxl_id arrives or reading fails"""
+        while True:
+            result, packet_id, error, params = self._receive(port)
+            if result != COMM_SUCCESS or packet_id == dxl_id:
+                return result, error, params
+
+    def _txrx(self, port, dxl_id, param_length, rx_param_length):
+        """Send the framed instruction and wait for its status packet"""
+        result = self._send(port, param_length)
+        if result != COMM_SUCCESS:
+            return result, 0, None
+        if dxl_id == BROADCAST_ID:
+            port.is_using = False
+            return result, 0, None
+        port.setPacketTimeout(STATUS_MIN_LENGTH + rx_param_length)
+        return self._receive_from(port, dxl_id)
+
+    # Instructions
+
+    def ping(self, port, dxl_id):
+        if dxl_id >= BROADCAST_ID:
+            return 0, COMM_NOT_AVAILABLE, 0
+        self._begin(dxl_id, INST_PING)
+        result, error, params = self._txrx(port, dxl_id, 0, 3)
+        if result == COMM_SUCCESS and len(params) >= 2:
+            return params[0] | params[1] << 8, result, error
+        return 0, result, error
+
+    def broadcastPing(self, port):
+        motors = {}
+        self._begin(BROADCAST_ID, INST_PING)
+        result = self._send(port, 0)
+        if result != COMM_SUCCESS:
+            port.is_using = False
+            return motors, result
+
+        # Every ID may answer; wait as long as the SDK does
+        wait_length = PING_STATUS_LENGTH * MAX_ID
+        tx_time_per_byte = 1000.0 / port.getBaudRate() * 10.0
+        port.setPacketTimeoutMillis(wait_length * tx_time_per_byte + 3.0 * MAX_ID + 16.0)
+        size = 0
+        while size < wait_length:
+            size = self._fill(port, size, wait_length - size)
+            if port.isPacketTimeout():
+                break
+        port.is_using = False
+        if size == 0:
+            return motors, COMM_RX_TIMEOUT
+
+        rx, view = self._rx, self._rx_view
+        result = COMM_RX_CORRUPT
+        idx = rx.find(HEADER, 0, size)
+        while 0 <= idx <= size - PING_STATUS_LENGTH:
+            end = idx + PING_STATUS_LENGTH
+            if crc16(view[idx:end - 2]) == (rx[end - 2] | rx[end - 1] << 8):
+                motors[rx[idx + 4]] = [rx[idx + 9] | rx[idx + 10] << 8, rx[idx + 11]]
+                result = COMM_SUCCESS
+                idx = rx.find(HEADER, end, size)
+            else:
+                idx = rx.find(HEADER, idx + 3, size)
+        return motors, result
+
+    def reboot(self, port, dxl_id):
+        self._begin(dxl_id, INST_REBOOT)
+        result, error, _ = self._txrx(port, dxl_id, 0, 0)
+        return result, error
+
+    def readTx(self, port, dxl_id, address, length):
+        if dxl_id >= BROADCAST_ID:
+            return COMM_NOT_AVAILABLE
+        self._begin(dxl_id, INST_READ)
+        struct.pack_into("<HH", self._tx, 8, address, length)
+        result = self._send(port, 4)
+        if result == COMM_SUCCESS:
+            port.setPacketTimeout(STATUS_MIN_LENGTH + length)
+        return result
+
+    def readRx(self, port, dxl_id, length):
+        result, error, params = self._receive_from(port, dxl_id)
+        if result == COMM_SUCCESS:
+            # Group reads keep the data, so copy it out of the rx buffer
+            return bytes(params[:length]), result, error
+        return b"", result, error
+
+    def _read(self, port, dxl_id, address, length):
+        """Read a register block, returning a view into the rx buffer"""
+        if dxl_id >= BROADCAST_ID:
+            return None, COMM_NOT_AVAILABLE, 0
+        self._begin(dxl_id, INST_READ)
+        struct.pack_into("<HH", self._tx, 8, address, length)
+        result, error, params = self._txrx(port, dxl_id, 4, length)
+        if result == COMM_SUCCESS and len(params) < length:
+            result = COMM_RX_CORRUPT
+        return params, result, error
+
+    def readTxRx(self, port, dxl_id, address, length):
+        params, result, error = self._read(port, dxl_id, address, length)
+        if result == COMM_SUCCESS:
+            return bytes(params[:length]), result, error
+        return b"", result, error
+
+    def read1ByteTxRx(self, port, dxl_id, address):
+        params, result, error = self._read(port, dxl_id, address, 1)
+        return (params[0] if result == COMM_SUCCESS else 0), result, error
+
+    def read2ByteTxRx(self, port, dxl_id, address):
+        params, result, error = self._read(port, dxl_id, address, 2)
+        return (struct.unpack_from("<H", params)[0] if result == COMM_SUCCESS else 0), result, error
+
+    def read4ByteTxRx(self, port, dxl_id, address):
+        params, result, error = self._read(port, dxl_id, address, 4)
+        return (struct.unpack_from("<I", params)[0] if result == COMM_SUCCESS else 0), result, error
+
+    def _write_value(self, port, dxl_id, address, size, value, wait_status=True):
+        """Write a 1/2/4-byte little-endian value (negative values wrap like the SDK)"""
+        self._begin(dxl_id, INST_WRITE)
+        struct.pack_into("<H", self._tx, 8, address)
+        self._tx[10:10 + size] = (value & ((1 << 8 * size) - 1)).to_bytes(size, "little")
+        if not wait_status:
+            result = self._send(port, 2 + size)
+            port.is_using = False
+            return result
+        result, error, _ = self._txrx(port, dxl_id, 2 + size, 0)
+        return result, error
+
+    def write1ByteTxRx(self, port, dxl_id, address, data):
+        return self._write_value(port, dxl_id, address, 1, data)
+
+    def write2ByteTxRx(self, port, dxl_id, address, data):
+        return self._write_value(port, dxl_id, address, 2, data)
+
+    def write4ByteTxRx(self, port, dxl_id, address, data):
+        return self._write_value(port, dxl_id, address, 4, data)
+
+    def write1ByteTxOnly(self, port, dxl_id, address, data):
+        return self._write_value(port, dxl_id, address, 1, data, wait_status=False)
+
+    def write2ByteTxOnly(self, port, dxl_id, address, data):
+        return self._write_value(port, dxl_id, address, 2, data, wait_status=False)
+
+    def write4ByteTxOnly(self, port, dxl_id, address, data):
+        return self._write_value(port, dxl_id, address, 4, data, wait_status=False)
+
+    def writeTxOnly(self, port, dxl_id, address, length, data):
+        self._begin(dxl_id, INST_WRITE)
+        struct.pack_into("<H", self._tx, 8, address)
+        if not self._put_params(2, data, length):
+            return COMM_TX_ERROR
+        result = self._send(port, 2 + length)
+        port.is_using = False
+        return result
+
+    def writeTxRx(self, port, dxl_id, address, length, data):
+        self._begin(dxl_id, INST_WRITE)
+        struct.pack_into("<H", self._tx, 8, address)
+        if not self._put_params(2, data, length):
+            return COMM_TX_ERROR, 0
+        result, error, _ = self._txrx(port, dxl_id, 2 + length, 0)
+        return result, error
+
+    # fast_option is only passed by dynamixel-sdk 3.8+ group readers
+    def syncReadTx(self, port, start_address, data_length, param, param_length,
+                   fast_option=False):
+        if fast_option:
+            return super().syncReadTx(port, start_address, data_length, param, param_length,
+                                      fast_option)
+        self._begin(BROADCAST_ID, INST_SYNC_READ)
+        struct.pack_into("<HH", self._tx, 8, start_address, data_length)
+        if not self._put_params(4, param, param_length):
+            return COMM_TX_ERROR
+        result = self._send(port, 4 + param_length)
+        if result == COMM_SUCCESS:
+            port.setPacketTimeout((STATUS_MIN_LENGTH + data_length) * param_length)
+        return result
+
+    def syncWriteTxOnly(self, port, start_address, data_length, param, param_length):
+        self._begin(BROADCAST_ID, INST_SYNC_WRITE)
+        struct.pack_into("<HH", self._tx, 8, start_address, data_length)
+        if not self._put_params(4, param, param_length):
+            return COMM_TX_ERROR
+        result = self._send(port, 4 + param_length)
+        port.is_using = False
+        return result
+
+    def bulkReadTx(self, port, param, param_length, fast_option=False):
+        if fast_option:
+            return super().bulkReadTx(port, param, param_length, fast_option)
+        self._begin(BROADCAST_ID, INST_BULK_READ)
+        if not self._put_params(0, param, param_length):
+            return COMM_TX_ERROR
+        result = self._send(port, param_length)
+        if result == COMM_SUCCESS:
+            # Each entry is ID, address(2), length(2)
+            wait_length = sum(
+                (param[i + 3] | param[i + 4] << 8) + 10 for i in range(0, param_length, 5)
+            )
+            port.setPacketTimeout(wait_length)
+        return result
+
+    def bulkWriteTxOnly(self, port, param, param_length):
+        self._begin(BROADCAST_ID, INST_BULK_WRITE)
+        if not self._put_params(0, param, param_length):
+            return COMM_TX_ERROR
+        result = self._send(port, param_length)
+        port.is_using = False
+        return result
+
+
+class LockedPacketHandler:
+    """
+    Packet handler proxy holding a bus lock for each transaction
+
+    Every method of the wrapped handler runs under lock, so a thread
+    interleaving with a move (emergency stop, status polls) waits for at
+    most the packet in flight instead of failing with COMM_PORT_BUSY.
+    Operations spanning several calls, such as a group sync read's tx and
+    rx, hold lock around the whole exchange; it is reentrant for that.
+    """
+
+    def __init__(self, handler, lock=None):
+        self.handler = handler
+        self.lock = lock or threading.RLock()
+
+    def __getattr__(self, name):
+        attr = getattr(self.handler, name)
+        if not callable(attr):
+            return attr
+
+        def locked(*args, **kwargs):
+            with self.lock:
+                return attr(*args, **kwargs)
+
+        return locked
@@ -0,0 +1,167 @@
+"""
+Shared-memory status board for lock-free status reads
+
+The process that owns the bus publishes the latest position, active hotel,
+motion state and health into a small fixed-layout file mapped into memory
+(under /dev/shm where available). Readers in any local process map the same
+file and read it without locks or system calls, so status traffic never
+competes with motion for the serial port.
+
+Records are guarded by a sequence lock: the writer makes the sequence odd,
+updates the record and makes it even again; a reader retries whenever the
+sequence was odd or changed while it copied the record.
+"""
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, Optional
+
+MAGIC = b"PRSB"
+LAYOUT_VERSION = 1
+
+# magic, layout version, sequence
+HEADER = struct.Struct("<4sIQ")
+SEQ_OFFSET = 8
+SEQ = struct.Struct("<Q")
+
+# version, updated, position, target, temperature, voltage, current,
+# health_updated, queue_depth, hardware_error, connected, moving, active_hotel
+RECORD = struct.Struct("<QdddddddIiBB32s")
+SIZE = HEADER.size + RECORD.size
+
+FIELDS = (
+    "version", "updated", "position", "target", "temperature", "voltage",
+    "current", "health_updated", "queue_depth", "hardware_error", "connected",
+    "moving", "active_hotel",
+)
+
+DEFAULT_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else "~/.plate-resort"
+
+
+def board_path(board_config, resort_id: str) -> str:
+    """Board file for one resort: <path>-<resort_id>"""
+    base = (board_config or {}).get("path") or os.path.join(DEFAULT_DIR, "plate-resort")
+    return os.path.expanduser(f"{base}-{resort_id}")
+
+
+class StatusBoard:
+    """
+    One resort's status record in shared memory
+
+    Open with writer=True in the process owning the bus; every other
+    process opens it read-only. Readers may be created before the writer
+    exists and attach on their first successful read.
+    """
+
+    def __init__(self, path: str, writer: bool = False):
+        self.path = os.path.expanduser(path)
+        self.writer = writer
+        self.buf = None
+        if writer:
+            self._write_lock = threading.Lock()
+            self._seq = 0
+            self.state: Dict[str, Any] = {
+                "version": 0, "updated": 0.0, "position": None, "target": None,
+                "temperature": None, "voltage": None, "current": None,
+                "health_updated": 0.0, "queue_depth": 0, "hardware_error": None,
+                "connected": False, "moving": False, "active_hotel": None,
+            }
+            self._open(os.O_RDWR | os.O_CREAT)
+            HEADER.pack_into(self.buf, 0, MAGIC, LAYOUT_VERSION, 0)
+            self._write()
+
+    def _open(self, flags) -> bool:
+        if self.writer:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        try:
+            # Keep an existing file so readers mapped before a restart stay attached
+            fd = os.open(self.path, flags, 0o644)
+        except FileNotFoundError:
+            return False
+        try:
+            if self.writer:
+                os.ftruncate(fd, SIZE)
+            elif os.fstat(fd).st_size < SIZE:
+                return False
+            access = mmap.ACCESS_WRITE if self.writer else mmap.ACCESS_READ
+            self.buf = mmap.mmap(fd, SIZE, access=access)
+        finally:
+            os.close(fd)
+        return True
+
+    def publish(self, **changes):
+        """Update fields and write the whole record under the sequence lock"""
+        with self._write_lock:
+            self.state.update(changes)
+            self.state["updated"] = time.time()
+            self._write()
+
+    def _write(self):
+        s = self.state
+        record = RECORD.pack(
+            s["version"],
+            s["updated"],
+            _float(s["position"]),
+            _float(s["target"]),
+            _float(s["temperature"]),
+            _float(s["voltage"]),
+            _float(s["current"]),
+            s["health_updated"],
+            s["queue_depth"],
+            -1 if s["hardware_error"] is None else s["hardware_error"],
+            s["connected"],
+            s["moving"],
+            (s["active_hotel"] or "").encode()[:32],
+        )
+        self._seq += 1
+        SEQ.pack_into(self.buf, SEQ_OFFSET, self._seq)
+        self.buf[HEADER.size:SIZE] = record
+        self._seq += 1
+        SEQ.pack_into(self.buf, SEQ_OFFSET, self._seq)
+
+    def read(self, retries: int = 1000) -> Optional[Dict[str, Any]]:
+        """
+        Consistent copy of the record, or None if no writer has published
+
+        Returns:
+            dict: Published fields plus 'age' in seconds since the last update
+        """
+        if self.buf is None and not self._open(os.O_RDONLY):
+            return None
+        if self.buf[:4] != MAGIC:
+            return None
+
+        buf = self.buf
+        for _ in range(retries):
+            seq = SEQ.unpack_from(buf, SEQ_OFFSET)[0]
+            if seq & 1:
+                continue
+            values = RECORD.unpack_from(buf, HEADER.size)
+            if SEQ.unpack_from(buf, SEQ_OFFSET)[0] == seq:
+                break
+        else:
+            return None
+
+        status = dict(zip(FIELDS, values))
+        for key in ("position", "target", "temperature", "voltage", "current"):
+            if math.isnan(status[key]):
+                status[key] = None
+        status["active_hotel"] = status["active_hotel"].rstrip(b"\0").decode() or None
+        status["connected"] = bool(status["connected"])
+        status["moving"] = bool(status["moving"])
+        if status["hardware_error"] < 0:
+            status["hardware_error"] = None
+        status["age"] = time.time() - status["updated"]
+        return status
+
+    def close(self):
+        if self.buf is not None:
+            self.buf.close()
+            self.buf = None
+
+
+def _float(value) -> float:
+    return math.nan if value is None else float(value)
@@ -0,0 +1,277 @@
+"""
+Line-oriented TCP control port for PLCs and robot controllers
+
+A compact text protocol served next to the HTTP API and mapped onto the same
+wrapper operations, so motion goes through the same lock, scheduler and move
+history. One command per line, case-insensitive:
+
+    AUTH <api key>           Authenticate (required first when auth is on)
+    RESORT <id>              Address another resort on this connection
+    CONNECT / DISCONNECT
+    ACT <hotel> [priority]   -> OK <hotel> <1|0 reached>
+    PLATE <plate id>         -> OK <hotel> <room> <1|0 reached>
+    HOME                     -> OK <1|0 reached>
+    MOVE <angle>             -> OK <angle> <1|0 reached>
+    SPEED <value>
+    STOP                     Emergency stop
+    POS?                     -> OK <degrees>
+    HOTEL?                   -> OK <hotel or ->
+    STATUS?                  -> OK <connected> <moving> <hotel> <degrees> <queue depth>
+    QUIT
+
+Replies are "OK [values]" or "ERR <code> <message>" with HTTP status codes.
+
+Commands are pipelined: a client may send several without waiting. Queries
+(ending in ?) and STOP run as soon as they arrive, and STOP does not wait for
+a running move to finish; other commands run one at a time in the order
+sent. Each reply is written when its command finishes, so prefix pipelined
+commands with a tag ("#7 ACT C" -> "#7 OK C 1") to match replies that
+complete out of order.
+"""
+import asyncio
+import functools
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from .scheduler import PRIORITIES
+from .wrapper import load_api_key
+
+MAX_IN_FLIGHT = 64
+
+
+class ControlError(Exception):
+    """A command rejected with an HTTP-style status code"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class ControlSession:
+    """One control connection"""
+
+    def __init__(self, server: "ControlServer", reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.resort_id = server.default_resort
+        self.authorized = not server.require_auth
+        self.sequence = asyncio.Lock()
+        self.tasks = set()
+
+    async def run(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                tag, words = parse(line)
+                if not words:
+                    continue
+                command = words[0].upper()
+                if command == "QUIT":
+                    break
+                if command in ("AUTH", "RESORT"):
+                    self.reply(tag, self.session_command(command, words[1:]))
+                elif len(self.tasks) >= MAX_IN_FLIGHT:
+                    self.reply(tag, f"ERR 429 More than {MAX_IN_FLIGHT} commands in flight")
+                else:
+                    task = asyncio.ensure_future(self.execute(tag, command, words[1:]))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+            if self.tasks:
+                await asyncio.wait(list(self.tasks))
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.writer.close()
+
+    def reply(self, tag: Optional[str], text: str):
+        line = f"{tag} {text}" if tag else text
+        self.writer.write(line.replace("\n", " ").encode() + b"\n")
+
+    def session_command(self, command: str, args: List[str]) -> str:
+        """AUTH and RESORT change connection state, so they run in line"""
+        if command == "AUTH":
+            try:
+                valid = bool(args) and hmac.compare_digest(args[0], load_api_key())
+            except TypeError:
+                # compare_digest only takes ASCII strings
+                valid = False
+            if valid:
+                self.authorized = True
+                return "OK"
+            return "ERR 401 Invalid API key"
+        if not self.authorized:
+            return "ERR 401 AUTH required"
+        if not args or args[0] not in self.server.wrappers:
+            return f"ERR 404 Resort {args[0] if args else ''} not found"
+        self.resort_id = args[0]
+        return "OK"
+
+    async def execute(self, tag: Optional[str], command: str, args: List[str]):
+        try:
+            if not self.authorized:
+                raise ControlError(401, "AUTH required")
+            handler = COMMANDS.get(command)
+            if handler is None:
+                raise ControlError(400, f"Unknown command {command}")
+
+            wrapper = self.server.wrappers[self.resort_id]
+            loop = asyncio.get_running_loop()
+            call = functools.partial(handler, self.server, wrapper, args)
+            if command.endswith("?") or command == "STOP":
+                # Not queued behind moves occupying the command threads
+                result = await loop.run_in_executor(None, call)
+            else:
+                async with self.sequence:
+                    result = await loop.run_in_executor(self.server.executor, call)
+            text = f"OK {result}" if result else "OK"
+        except ControlError as e:
+            text = f"ERR {e.code} {e}"
+        except Exception as e:
+            text = f"ERR {self.server.error_status(e)} {e}"
+        self.reply(tag, text)
+
+
+def parse(line: bytes):
+    """Split a command line into its optional #tag and words"""
+    words = line.decode(errors="replace").split()
+    tag = None
+    if words and words[0].startswith("#"):
+        tag = words.pop(0)
+    return tag, words
+
+
+def arg(args: List[str], index: int, name: str, convert=str):
+    try:
+        return convert(args[index])
+    except IndexError:
+        raise ControlError(400, f"Missing {name}")
+    except ValueError:
+        raise ControlError(400, f"Invalid {name} {args[index]}")
+
+
+def flag(value) -> str:
+    return "1" if value else "0"
+
+
+def cmd_connect(server, wrapper, args):
+    wrapper.connect()
+
+
+def cmd_disconnect(server, wrapper, args):
+    wrapper.disconnect()
+
+
+def cmd_act(server, wrapper, args):
+    hotel = arg(args, 0, "hotel")
+    priority = args[1].lower() if len(args) > 1 else "normal"
+    if priority not in PRIORITIES:
+        raise ControlError(400, f"Invalid priority {priority}")
+    result = wrapper.activate_hotel(hotel, priority)
+    return f"{hotel} {flag(result['reached'])}"
+
+
+def cmd_plate(server, wrapper, args):
+    plate_id = arg(args, 0, "plate id")
+    try:
+        result = wrapper.activate_plate(plate_id)
+    except KeyError:
+        raise ControlError(404, f"Plate {plate_id} not found")
+    return f"{result['hotel']} {result['room']} {flag(result['reached'])}"
+
+
+def cmd_home(server, wrapper, args):
+    return flag(wrapper.go_home()["reached"])
+
+
+def cmd_move(server, wrapper, args):
+    angle = arg(args, 0, "angle", float)
+    return f"{angle:g} {flag(wrapper.move_to_angle(angle)['reached'])}"
+
+
+def cmd_speed(server, wrapper, args):
+    wrapper.set_speed(arg(args, 0, "speed", int))
+
+
+def cmd_stop(server, wrapper, args):
+    wrapper.emergency_stop()
+
+
+def cmd_pos(server, wrapper, args):
+    status = server.board_status(wrapper)
+    if status is not None and status["connected"] and status["position"] is not None:
+        return f"{status['position']:.2f}"
+    return f"{wrapper.get_current_position():.2f}"
+
+
+def cmd_hotel(server, wrapper, args):
+    status = server.board_status(wrapper) or wrapper.status()
+    return status.get("active_hotel") or "-"
+
+
+def cmd_status(server, wrapper, args):
+    status = server.board_status(wrapper) or wrapper.status()
+    position = status.get("position")
+    return " ".join([
+        flag(status.get("connected")),
+        flag(status.get("moving")),
+        status.get("active_hotel") or "-",
+        "-" if position is None else f"{position:.2f}",
+        str(status.get("queue_depth", 0)),
+    ])
+
+
+COMMANDS = {
+    "CONNECT": cmd_connect,
+    "DISCONNECT": cmd_disconnect,
+    "ACT": cmd_act,
+    "PLATE": cmd_plate,
+    "HOME": cmd_home,
+    "MOVE": cmd_move,
+    "SPEED": cmd_speed,
+    "STOP": cmd_stop,
+    "POS?": cmd_pos,
+    "HOTEL?": cmd_hotel,
+    "STATUS?": cmd_status,
+}
+
+
+class ControlServer:
+    """
+    asyncio server for the control port, run on the HTTP server's event loop
+
+    Args:
+        wrappers: Resort ID -> wrapper, as served over HTTP
+        default_resort: Resort addressed until RESORT is sent
+        error_status: Maps a failed operation to an HTTP status code
+        board_status: Returns fresh status-board data for a wrapper, or None
+        require_auth: Require AUTH before other commands
+        max_workers: Threads running queued commands (moves) at once
+    """
+
+    def __init__(self, wrappers, default_resort: str, error_status: Callable,
+                 board_status: Callable, require_auth: bool = True, max_workers: int = 16):
+        self.wrappers = wrappers
+        self.default_resort = default_resort
+        self.error_status = error_status
+        self.board_status = board_status
+        self.require_auth = require_auth
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="control")
+        self.server = None
+
+    async def start(self, host: str, port: int, reuse_port: bool = False):
+        self.server = await asyncio.start_server(
+            self.handle, host, port, reuse_port=reuse_port or None
+        )
+
+    async def handle(self, reader, writer):
+        await ControlSession(self, reader, writer).run()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,293 @@
+"""
+Hardware daemon: the single process that owns the serial port(s)
+
+The daemon holds the PlateResortWrapper for every configured resort (and so
+the locks, motion schedulers and state stores) and serves their methods over
+a local Unix-domain socket. HTTP workers use RemoteWrapper, a drop-in proxy
+with the same methods, so any number of uvicorn worker processes can handle
+auth, JSON and streaming while motion stays serialized in one place.
+
+Wire format: every message is a 4-byte big-endian length followed by a
+compact JSON object.
+
+    request   {"r": resort_id, "m": method, "a": [args...]}
+    reply     {"ok": result}
+              {"err": [exception type, message, retry_after]}
+    stream    {"ev": event} ... then a final {"ok": null}; {"ev": null}
+              is a keepalive
+"""
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from .board import StatusBoard, board_path
+from .idempotency import IdempotencyKeyReused
+from .scheduler import QueueFullError, DeadlineError
+from .wrapper import load_config, load_wrappers, resort_ids
+
+DEFAULT_SOCKET = "~/.plate-resort/hardware.sock"
+
+FRAME_HEADER = struct.Struct("!I")
+MAX_FRAME = 16 * 1024 * 1024
+
+# Wrapper methods callable over the socket
+METHODS = {
+    "connect", "disconnect", "discover", "status", "get_motor_health",
+    "activate_hotel", "go_home", "move_to_angle", "estimate",
+    "place_plate", "remove_plate", "locate_plate", "list_plates", "plate_at",
+    "free_slots", "activate_plate", "recommend_slot", "rebalance_plan",
+    "start_retrieval", "release_retrieval", "move_history", "queue_status",
+    "get_current_position", "set_speed", "emergency_stop", "get_hotels",
+    "describe", "idempotent", "motion_state", "snapshot",
+    "metadata_version", "reload_config", "calibrate", "calibration",
+    "clear_calibration", "wait",
+}
+
+# Exceptions re-raised with their own type on the worker side
+ERRORS = {
+    cls.__name__: cls
+    for cls in (
+        QueueFullError, DeadlineError, IdempotencyKeyReused, ValueError, KeyError, RuntimeError
+    )
+}
+
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    """Serialize one message with its length prefix"""
+    body = json.dumps(message, separators=(",", ":")).encode()
+    return FRAME_HEADER.pack(len(body)) + body
+
+
+def read_frame(rfile) -> Optional[Dict[str, Any]]:
+    """Read one message, or None at end of stream"""
+    header = rfile.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes exceeds {MAX_FRAME}")
+    body = rfile.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body)
+
+
+def encode_error(e: Exception) -> List[Any]:
+    """Describe an exception by its closest transportable type"""
+    name = next(
+        (cls.__name__ for cls in type(e).__mro__ if cls.__name__ in ERRORS), "Exception"
+    )
+    message = e.args[0] if e.args else str(e)
+    if not isinstance(message, (str, int, float)):
+        message = str(message)
+    return [name, message, getattr(e, "retry_after", None)]
+
+
+def decode_error(error: List[Any]) -> Exception:
+    """Rebuild an exception sent by the daemon"""
+    name, message, retry_after = error
+    if name == "QueueFullError":
+        return QueueFullError(message, retry_after)
+    return ERRORS.get(name, RuntimeError)(message)
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    """Serve requests from one worker connection until it closes"""
+
+    def handle(self):
+        while True:
+            try:
+                request = read_frame(self.rfile)
+            except (OSError, ValueError):
+                return
+            if request is None:
+                return
+            try:
+                self.dispatch(request)
+            except OSError:
+                return
+
+    def dispatch(self, request: Dict[str, Any]):
+        try:
+            wrapper = self.server.wrappers[request["r"]]
+            method = request["m"]
+            args = request.get("a", [])
+            if method == "retrieval_events":
+                return self.stream_events(wrapper, *args)
+            if method not in METHODS:
+                raise ValueError(f"Unknown method {method}")
+
+            result = getattr(wrapper, method)(*args)
+            if method == "start_retrieval":
+                self.server.jobs[result.id] = result
+                result = result.id
+            reply = {"ok": result}
+        except Exception as e:
+            reply = {"err": encode_error(e)}
+        self.wfile.write(encode_frame(reply))
+
+    def stream_events(self, wrapper, job_id: str):
+        job = self.server.jobs.pop(job_id, None)
+        if job is None:
+            raise KeyError(job_id)
+        events = wrapper.retrieval_events(job)
+        try:
+            for event in events:
+                self.wfile.write(encode_frame({"ev": event}))
+        finally:
+            # A worker that went away aborts the job
+            events.close()
+        self.wfile.write(encode_frame({"ok": None}))
+
+
+class HardwareDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server exposing resort wrappers to HTTP workers"""
+
+    daemon_threads = True
+
+    def __init__(self, wrappers, path: str, mode: int = 0o660):
+        self.wrappers = wrappers
+        self.path = os.path.expanduser(path)
+        # Retrieval jobs started over the socket, until their events are streamed
+        self.jobs: Dict[str, Any] = {}
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        super().__init__(self.path, DaemonHandler)
+        os.chmod(self.path, mode)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class RemoteJob:
+    """A retrieval job running in the hardware daemon"""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+
+
+class RemoteWrapper:
+    """
+    Proxy with the PlateResortWrapper interface forwarding to the daemon
+
+    Each thread keeps its own connection, so concurrent requests in a worker
+    do not wait on each other's replies; retrieval event streams use a
+    connection of their own. With a status board, status reads come straight
+    from shared memory instead.
+    """
+
+    def __init__(self, path: str, resort_id: str, board: Optional[StatusBoard] = None):
+        self.path = os.path.expanduser(path)
+        self.resort_id = resort_id
+        self.board = board
+        self.local = threading.local()
+
+    def _open(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise RuntimeError(f"Hardware daemon unavailable at {self.path}: {e}")
+        return sock, sock.makefile("rb")
+
+    def _close(self):
+        sock, rfile = self.local.conn
+        self.local.conn = None
+        rfile.close()
+        sock.close()
+
+    def _call(self, method: str, *args):
+        frame = encode_frame({"r": self.resort_id, "m": method, "a": list(args)})
+        if getattr(self.local, "conn", None) is None:
+            self.local.conn = self._open()
+        try:
+            self.local.conn[0].sendall(frame)
+        except OSError:
+            # Stale connection (daemon restarted): nothing was delivered, retry once
+            self._close()
+            self.local.conn = self._open()
+            self.local.conn[0].sendall(frame)
+
+        try:
+            reply = read_frame(self.local.conn[1])
+        except OSError:
+            reply = None
+        if reply is None:
+            self._close()
+            raise RuntimeError("Hardware daemon closed the connection")
+        if "err" in reply:
+            raise decode_error(reply["err"])
+        return reply["ok"]
+
+    def __getattr__(self, name):
+        if name not in METHODS:
+            raise AttributeError(name)
+        return lambda *args: self._call(name, *args)
+
+    def start_retrieval(self, plates, slots, priority="normal", release_timeout=None) -> RemoteJob:
+        return RemoteJob(self._call("start_retrieval", plates, slots, priority, release_timeout))
+
+    def retrieval_events(self, job: RemoteJob) -> Iterator[Optional[Dict[str, Any]]]:
+        """Yield progress events (None for keepalives) of a retrieval job until it finishes"""
+        sock, rfile = self._open()
+        try:
+            sock.sendall(encode_frame({"r": self.resort_id, "m": "retrieval_events", "a": [job.id]}))
+            while True:
+                message = read_frame(rfile)
+                if message is None:
+                    raise RuntimeError("Hardware daemon closed the connection")
+                if "err" in message:
+                    raise decode_error(message["err"])
+                if "ev" not in message:
+                    return
+                yield message["ev"]
+        finally:
+            rfile.close()
+            sock.close()
+
+
+def remote_wrappers(config, path: str) -> Dict[str, RemoteWrapper]:
+    """One daemon proxy per configured resort, keyed by resort ID"""
+    board_config = config.get("server", {}).get("status_board") or {}
+    wrappers = {}
+    for resort_id in resort_ids(config):
+        board = None
+        if board_config.get("enabled"):
+            board = StatusBoard(board_path(board_config, resort_id))
+        wrappers[resort_id] = RemoteWrapper(path, resort_id, board)
+    return wrappers
+
+
+def socket_path(server_config) -> str:
+    """Configured daemon socket path, with ~ expanded"""
+    daemon_config = server_config.get("hardware_daemon") or {}
+    return os.path.expanduser(daemon_config.get("socket", DEFAULT_SOCKET))
+
+
+def main():
+    """Entry point for the plate-resort-daemon command"""
+    config = load_config()
+    path = socket_path(config.get("server", {}))
+    daemon = HardwareDaemon(load_wrappers(config), path)
+    print(f"🔌 Hardware daemon serving {list(daemon.wrappers)} on {path}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+        for wrapper in daemon.wrappers.values():
+            wrapper.disconnect()
+
+
+if __name__ == "__main__":
+    main()
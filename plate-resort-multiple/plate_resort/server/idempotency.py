@@ -0,0 +1,88 @@
+"""
+Idempotency keys for mutating requests
+
+A client retrying a request whose response was lost sends the same
+Idempotency-Key; the server replays the stored result instead of moving
+again. A retry arriving while the original is still running waits for it.
+"""
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Tuple
+
+
+class IdempotencyKeyReused(Exception):
+    """An Idempotency-Key was sent again with a different request"""
+
+
+class _Entry:
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.result = None
+
+
+class IdempotencyCache:
+    """Bounded LRU of idempotency keys and the results of their requests"""
+
+    def __init__(self, max_keys: int = 1024):
+        self.max_keys = max_keys
+        self.entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def run(self, key: str, request, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run func once per key
+
+        Failed operations are not stored, so a retry after an error runs
+        again; retries waiting on a failing original get the same error.
+
+        Args:
+            key: Client-supplied idempotency key
+            request: JSON-serializable description of the request, compared
+                against the original when a key is repeated
+            func: The operation
+
+        Returns:
+            (result, replayed): replayed is True if the result was stored
+        """
+        fingerprint = json.dumps(request, sort_keys=True, default=str)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = _Entry(fingerprint)
+                self._evict()
+                owner = True
+            elif entry.fingerprint != fingerprint:
+                raise IdempotencyKeyReused(
+                    f"Idempotency-Key {key} was used for a different request"
+                )
+            else:
+                self.entries.move_to_end(key)
+                owner = False
+
+        if not owner:
+            entry.done.wait()
+            if isinstance(entry.result, Exception):
+                raise entry.result
+            return entry.result, True
+
+        try:
+            entry.result = func()
+            return entry.result, False
+        except Exception as e:
+            entry.result = e
+            with self.lock:
+                if self.entries.get(key) is entry:
+                    del self.entries[key]
+            raise
+        finally:
+            entry.done.set()
+
+    def _evict(self):
+        """Drop the least recently used finished keys beyond max_keys (caller holds lock)"""
+        excess = len(self.entries) - self.max_keys
+        if excess <= 0:
+            return
+        for key in [k for k, e in self.entries.items() if e.done.is_set()][:excess]:
+            del self.entries[key]
@@ -1,59 +1,215 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Header, Path, Query
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from email.utils import formatdate, parsedate_to_datetime
 from pydantic import BaseModel
+from typing import Dict, List, Literal, Optional
+import asyncio
+import functools
+import hashlib
+import json
+import math
+import time
+import socket
 import sys
 import os
-import yaml
 
 # Add parent directory to path to import plate_resort
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from server.wrapper import PlateResortWrapper, require_api_key, load_api_key
+from server.wrapper import (
+    LOCAL_SOCKET_SCOPE,
+    SNAPSHOT_FIELDS,
+    PlateResortWrapper,
+    require_api_key,
+    load_api_key,
+    load_config,
+    load_wrappers,
+    wait_conditions,
+    wait_result,
+)
+from server.daemon import remote_wrappers, socket_path
+from server.control import ControlServer
+from server.idempotency import IdempotencyKeyReused
+from server.scheduler import QueueFullError, DeadlineError
+from plate_resort.core import BAUD_RATES
 
+config = load_config()
+server_config = config.get("server", {})
 
-def load_config():
-    """Load configuration from YAML file"""
-    config_file = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-        "resort_config.yaml",
-    )
-    try:
-        with open(config_file, "r") as f:
-            return yaml.safe_load(f)
-    except Exception as e:
-        print(f"Warning: Could not load config file {config_file}: {e}")
-        return {}
+control_config = server_config.get("control_port") or {}
 
 
-config = load_config()
-server_config = config.get("server", {})
+@asynccontextmanager
+async def lifespan(app):
+    """Run the line-oriented control port next to the HTTP API if configured"""
+    control = None
+    if control_config.get("port"):
+        control = ControlServer(
+            wrappers,
+            default_resort,
+            error_status,
+            board_status,
+            require_auth=control_config.get("require_auth", True),
+            max_workers=control_config.get("max_workers", 16),
+        )
+        await control.start(
+            control_config.get("host", server_config.get("host", "0.0.0.0")),
+            control_config["port"],
+            reuse_port=server_config.get("workers", 1) > 1,
+        )
+    yield
+    if control is not None:
+        await control.close()
+
 
 app = FastAPI(
     title="Plate Resort API",
     version="2.0.0",
     description="REST API for Plate Resort Control System",
     docs_url="/docs" if server_config.get("docs_enabled", True) else None,
+    lifespan=lifespan,
 )
-wrapper = PlateResortWrapper()
+
+
+# With the hardware daemon enabled the serial ports belong to the daemon and
+# this process (or each of several workers) only forwards requests to it
+daemon_config = server_config.get("hardware_daemon") or {}
+if daemon_config.get("enabled"):
+    wrappers = remote_wrappers(config, socket_path(server_config))
+else:
+    wrappers = load_wrappers(config)
+default_resort = next(iter(wrappers))
+wrapper = wrappers[default_resort]
+
+
+def resort_path(resort_id: str = Path(...)) -> PlateResortWrapper:
+    """Resolve the resort addressed by /resorts/{resort_id}"""
+    try:
+        return wrappers[resort_id]
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Resort {resort_id} not found")
+
+
+def get_wrapper(request: Request) -> PlateResortWrapper:
+    """
+    The resort a route addresses: from the /resorts/{resort_id} prefix
+    (validated by resort_path), else the first one
+    """
+    resort_id = request.path_params.get("resort_id")
+    return wrapper if resort_id is None else wrappers[resort_id]
+
+
+board_config = server_config.get("status_board") or {}
+
+
+def board_status(wrapper) -> Optional[Dict]:
+    """Fresh status from the shared-memory status board, None to ask the wrapper"""
+    if wrapper.board is None:
+        return None
+    status = wrapper.board.read()
+    if status is None or status["age"] > board_config.get("max_age", 1.0):
+        return None
+    if status["connected"] and status["position"] is None:
+        return None  # Connected, but no position published yet
+    return status
+
+
+router = APIRouter()
 
 
 class ConnectRequest(BaseModel):
-    device: str = "/dev/ttyUSB0"
-    baudrate: int = 57600
-    motor_id: int = 1
+    # Values from the resort's config when omitted
+    device: Optional[str] = None
+    baudrate: Optional[int] = None
+    motor_id: Optional[int] = None
+
+
+class MotionRequest(BaseModel):
+    priority: Literal["critical", "normal", "background"] = "normal"
+    deadline: Optional[float] = None  # Seconds from now to finish the move
+    dry_run: bool = False  # Validate and plan without moving
+
+
+class ActivateRequest(MotionRequest):
+    hotel: str
+
+
+class CalibrationRequest(BaseModel):
+    hotels: Optional[List[str]] = None  # All hotels if omitted
+    repeats: int = 1  # Approaches per direction, averaged
+    priority: Literal["critical", "normal", "background"] = "normal"
+
+
+class PlateRequest(BaseModel):
+    plate_id: str
+    hotel: str
+    room: Optional[int] = None  # Lowest free room if omitted
 
 
-class ActivateRequest(BaseModel):
+class SlotRequest(BaseModel):
     hotel: str
+    room: int
+
+
+class RetrieveRequest(BaseModel):
+    plates: List[str] = []
+    slots: List[SlotRequest] = []
+    priority: Literal["critical", "normal", "background"] = "normal"
+    release_timeout: Optional[float] = None  # Seconds to wait for release at each hotel
 
 
 class SpeedRequest(BaseModel):
     speed: int
 
 
-class AngleRequest(BaseModel):
+class AngleRequest(MotionRequest):
     angle: float
 
 
+def error_status(e: Exception) -> int:
+    """HTTP status code for a failed motion request"""
+    if isinstance(e, QueueFullError):
+        return 429
+    if isinstance(e, DeadlineError):
+        return 409
+    if isinstance(e, ValueError):
+        return 400
+    return 500
+
+
+def motion_error(e: Exception) -> HTTPException:
+    """Map a failed motion request to an HTTP error"""
+    if isinstance(e, HTTPException):
+        return e
+    headers = None
+    if isinstance(e, QueueFullError):
+        headers = {"Retry-After": str(math.ceil(e.retry_after))}
+    return HTTPException(status_code=error_status(e), detail=str(e), headers=headers)
+
+
+def call_idempotent(
+    wrapper, key: Optional[str], response: Response, method: str, *args
+):
+    """
+    Call a mutating wrapper method. With an Idempotency-Key header, a repeated
+    key returns the original result (marked Idempotent-Replayed) without
+    running the method again; reusing a key for a different request is
+    rejected with 422.
+    """
+    if key is None:
+        return getattr(wrapper, method)(*args)
+    try:
+        result, replayed = wrapper.idempotent(key, method, *args)
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
 @app.get("/")
 def root():
     """API status and info"""
@@ -65,94 +221,600 @@ def root():
     }
 
 
-@app.post("/connect")
-def connect(req: ConnectRequest, x_api_key: str = Depends(require_api_key)):
+@router.post("/connect")
+def connect(
+    req: ConnectRequest,
+    response: Response,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
     """Connect to Dynamixel motor"""
     try:
-        wrapper.connect(req.device, req.baudrate, req.motor_id)
-        return {"status": "connected", "device": req.device}
+        call_idempotent(
+            wrapper,
+            idempotency_key,
+            response,
+            "connect",
+            req.device,
+            req.baudrate,
+            req.motor_id,
+        )
+        return {"status": "connected", "device": wrapper.describe()["device"]}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/disconnect")
-def disconnect(x_api_key: str = Depends(require_api_key)):
+@router.get("/discover")
+def discover(
+    baud: List[int] = Query([]),
+    scan: bool = False,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """
+    Find motors on the bus (IDs, model numbers, firmware) by broadcast ping,
+    at the given baud rates or every supported rate if scan is set
+    """
+    try:
+        return wrapper.discover(BAUD_RATES if scan else baud or None)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/disconnect")
+def disconnect(
+    response: Response,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
     """Disconnect from motor"""
-    wrapper.disconnect()
+    call_idempotent(wrapper, idempotency_key, response, "disconnect")
     return {"status": "disconnected"}
 
 
-@app.get("/status")
-def status(x_api_key: str = Depends(require_api_key)):
+@router.get("/status")
+def status(
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
     """Get system status"""
-    return wrapper.status()
+    status = board_status(wrapper)
+    if status is None:
+        return wrapper.status()
+    return {
+        "connected": status["connected"],
+        "position": status["position"] if status["connected"] else None,
+        "active_hotel": status["active_hotel"] if status["connected"] else None,
+        "queue_depth": status["queue_depth"],
+        "moving": status["moving"],
+        "version": status["version"],
+        "age": status["age"],
+    }
+
+
+wait_config = server_config.get("wait") or {}
+
 
+@router.get("/wait")
+async def wait(
+    idle: bool = False,
+    hotel: Optional[str] = None,
+    angle: Optional[float] = None,
+    tolerance: Optional[float] = None,
+    version: Optional[int] = None,
+    timeout: float = Query(30.0, gt=0),
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """
+    Long-poll until every given condition holds or timeout seconds pass: idle
+    (no move running or queued), hotel active and settled, position within
+    tolerance of angle, or state version greater than the one given (from
+    /status or a previous /wait). With no condition, waits for idle.
+    """
+    if not (idle or hotel or angle is not None or version is not None):
+        idle = True
+    timeout = min(timeout, wait_config.get("max_timeout", 300))
+    if not isinstance(wrapper, PlateResortWrapper):
+        # Block in the daemon rather than polling it over the socket
+        try:
+            return await run_in_threadpool(
+                wrapper.wait, idle, hotel, angle, tolerance, version, timeout
+            )
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Hotel {hotel} not found")
 
-@app.get("/health")
-def health(x_api_key: str = Depends(require_api_key)):
+    if hotel is not None and hotel not in wrapper.resort.hotels:
+        raise HTTPException(status_code=404, detail=f"Hotel {hotel} not found")
+    if tolerance is None:
+        tolerance = wrapper.resort.config["position_tolerance"]
+    interval = wait_config.get("poll_interval", 0.05)
+
+    start = time.time()
+    while True:
+        # Poll without holding a thread: the status board when fresh, else
+        # the wrapper's last known state (no bus access, no lock)
+        state = board_status(wrapper) or wrapper.motion_state()
+        met = wait_conditions(state, idle, hotel, angle, tolerance, version)
+        waited = time.time() - start
+        if met or waited >= timeout:
+            return wait_result(state, met, waited)
+        await asyncio.sleep(min(interval, timeout - waited))
+
+
+@router.get("/health")
+def health(
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
     """Get motor health diagnostics"""
     return wrapper.get_motor_health()
 
 
-@app.post("/activate")
-def activate(req: ActivateRequest, x_api_key: str = Depends(require_api_key)):
+@router.post("/activate")
+def activate(
+    req: ActivateRequest,
+    response: Response,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
     """Move to specified hotel"""
     try:
-        wrapper.activate_hotel(req.hotel)
-        return {"status": "moving", "hotel": req.hotel}
+        result = call_idempotent(
+            wrapper,
+            idempotency_key,
+            response,
+            "activate_hotel",
+            req.hotel,
+            req.priority,
+            req.deadline,
+            req.dry_run,
+        )
+        if req.dry_run:
+            return {"status": "planned", "hotel": req.hotel, **result}
+        return {"status": "moving", "hotel": req.hotel, **result}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise motion_error(e)
 
 
-@app.post("/home")
-def go_home(x_api_key: str = Depends(require_api_key)):
+@router.post("/home")
+def go_home(
+    response: Response,
+    req: Optional[MotionRequest] = None,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
     """Return to home position"""
+    req = req or MotionRequest()
     try:
-        wrapper.go_home()
-        return {"status": "moving_home"}
+        result = call_idempotent(
+            wrapper,
+            idempotency_key,
+            response,
+            "go_home",
+            req.priority,
+            req.deadline,
+            req.dry_run,
+        )
+        if req.dry_run:
+            return {"status": "planned", **result}
+        return {"status": "moving_home", **result}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise motion_error(e)
 
 
-@app.post("/move_to_angle")
-def move_to_angle(req: AngleRequest, x_api_key: str = Depends(require_api_key)):
+@router.post("/move_to_angle")
+def move_to_angle(
+    req: AngleRequest,
+    response: Response,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
     """Move to specific angle in degrees"""
     try:
-        wrapper.move_to_angle(req.angle)
-        return {"status": "moving", "angle": req.angle}
+        result = call_idempotent(
+            wrapper,
+            idempotency_key,
+            response,
+            "move_to_angle",
+            req.angle,
+            req.priority,
+            req.deadline,
+            req.dry_run,
+        )
+        if req.dry_run:
+            return {"status": "planned", "angle": req.angle, **result}
+        return {"status": "moving", "angle": req.angle, **result}
+    except Exception as e:
+        raise motion_error(e)
+
+
+@router.get("/plates")
+def list_plates(
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """List all plates in the inventory and their slots"""
+    return wrapper.list_plates()
+
+
+@router.post("/plates")
+def place_plate(
+    req: PlateRequest,
+    response: Response,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Record a plate in a hotel room"""
+    try:
+        return call_idempotent(
+            wrapper,
+            idempotency_key,
+            response,
+            "place_plate",
+            req.plate_id,
+            req.hotel,
+            req.room,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/plates/{plate_id}")
+def locate_plate(
+    plate_id: str,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Find the hotel and room holding a plate"""
+    try:
+        return wrapper.locate_plate(plate_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Plate {plate_id} not found")
+
+
+@router.delete("/plates/{plate_id}")
+def remove_plate(
+    plate_id: str,
+    response: Response,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Remove a plate from the inventory"""
+    try:
+        return call_idempotent(
+            wrapper, idempotency_key, response, "remove_plate", plate_id
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Plate {plate_id} not found")
+
+
+@router.post("/plates/{plate_id}/activate")
+def activate_plate(
+    plate_id: str,
+    response: Response,
+    req: Optional[MotionRequest] = None,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Move to the hotel holding a plate"""
+    req = req or MotionRequest()
+    try:
+        result = call_idempotent(
+            wrapper,
+            idempotency_key,
+            response,
+            "activate_plate",
+            plate_id,
+            req.priority,
+            req.deadline,
+            req.dry_run,
+        )
+        return {"status": "planned" if req.dry_run else "moving", **result}
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Plate {plate_id} not found")
+    except Exception as e:
+        raise motion_error(e)
+
+
+@router.get("/placement")
+def placement(
+    plate_id: Optional[str] = None,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Recommend the slot minimising expected rotation for a new or returning plate"""
+    try:
+        return wrapper.recommend_slot(plate_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/placement/rebalance")
+def rebalance(
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Plan plate moves putting frequently accessed plates in the cheapest hotels"""
+    return wrapper.rebalance_plan()
+
+
+@router.post("/retrieve")
+def retrieve(
+    req: RetrieveRequest,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """
+    Visit the hotels holding the requested plates/slots in rotation-optimal
+    order, streaming progress as newline-delimited JSON. At each hotel the
+    motor is held until POST /retrieve/{job_id}/release; the job is aborted
+    if the stream is closed.
+    """
+    try:
+        slots = [{"hotel": s.hotel, "room": s.room} for s in req.slots]
+        job = wrapper.start_retrieval(
+            req.plates, slots, req.priority, req.release_timeout
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Plate {e.args[0]} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        event_lines(wrapper.retrieval_events(job)), media_type="application/x-ndjson"
+    )
+
+
+def event_lines(events):
+    """
+    NDJSON lines of retrieval events, with a blank keepalive line for None.
+    Closing it (the client went away) closes events, aborting the job.
+    """
+    try:
+        for event in events:
+            yield "\n" if event is None else json.dumps(event) + "\n"
+    finally:
+        events.close()
+
+
+@router.post("/retrieve/{job_id}/release")
+def release(
+    job_id: str,
+    response: Response,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Release the motor at the current hotel of a retrieval job"""
+    try:
+        call_idempotent(wrapper, idempotency_key, response, "release_retrieval", job_id)
+        return {"status": "released", "job_id": job_id}
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Retrieval job {job_id} not found")
+
+
+@router.get("/slots")
+def free_slots(
+    hotel: Optional[str] = None,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """List free slots, optionally for one hotel"""
+    try:
+        return wrapper.free_slots(hotel)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/slots/{hotel}/{room}")
+def plate_at(
+    hotel: str,
+    room: int,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Find the plate occupying a slot"""
+    try:
+        return wrapper.plate_at(hotel, room)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/estimate")
+def estimate(
+    hotel: List[str] = Query([]),
+    angle: List[float] = Query([]),
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Predict move durations to one or more hotels or angles from the current position"""
+    if not hotel and not angle:
+        raise HTTPException(
+            status_code=400, detail="Specify at least one hotel or angle"
+        )
+    try:
+        return wrapper.estimate(hotel + angle)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/set_speed")
-def set_speed(req: SpeedRequest, x_api_key: str = Depends(require_api_key)):
+@router.get("/moves")
+def moves(
+    limit: int = 50,
+    target: Optional[str] = None,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Recent move history, optionally for one target (e.g. hotel:A)"""
+    return wrapper.move_history(limit, target)
+
+
+@router.get("/queue")
+def queue(
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Get pending motion requests, queue depth and expected waits"""
+    return wrapper.queue_status()
+
+
+@router.get("/calibration")
+def calibration(
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Per-hotel goal position offsets, approach directions and backlash"""
+    return wrapper.calibration()
+
+
+@router.post("/calibration")
+def calibrate(
+    response: Response,
+    req: Optional[CalibrationRequest] = None,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
+    """
+    Approach each hotel from both directions, measure where it settles and
+    store the tick offset and approach direction activate uses from then on
+    """
+    req = req or CalibrationRequest()
+    try:
+        return call_idempotent(
+            wrapper,
+            idempotency_key,
+            response,
+            "calibrate",
+            req.hotels,
+            req.repeats,
+            req.priority,
+        )
+    except Exception as e:
+        raise motion_error(e)
+
+
+@router.delete("/calibration")
+def clear_calibration(
+    response: Response,
+    hotels: Optional[List[str]] = Query(None),
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
+    """Drop calibration for the given hotels (all if none), back to nominal targets"""
+    return call_idempotent(
+        wrapper, idempotency_key, response, "clear_calibration", hotels
+    )
+
+
+@router.post("/set_speed")
+def set_speed(
+    req: SpeedRequest,
+    response: Response,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
     """Set motor movement speed"""
     try:
-        wrapper.set_speed(req.speed)
+        call_idempotent(wrapper, idempotency_key, response, "set_speed", req.speed)
         return {"status": "speed_set", "speed": req.speed}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/emergency_stop")
-def emergency_stop(x_api_key: str = Depends(require_api_key)):
+@router.post("/emergency_stop")
+def emergency_stop(
+    response: Response,
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    idempotency_key: Optional[str] = Header(None),
+    x_api_key: str = Depends(require_api_key),
+):
     """Emergency stop motor"""
     try:
-        wrapper.emergency_stop()
+        call_idempotent(wrapper, idempotency_key, response, "emergency_stop")
         return {"status": "emergency_stopped"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/hotels")
-def hotels(x_api_key: str = Depends(require_api_key)):
-    """Get available hotels and their angles"""
-    return wrapper.get_hotels()
+metadata_config = server_config.get("metadata") or {}
 
 
-@app.get("/position")
-def get_position(x_api_key: str = Depends(require_api_key)):
+def not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: Optional[float] = None,
+) -> bool:
+    """Conditional GET check; If-None-Match takes precedence over If-Modified-Since"""
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return last_modified <= since
+    return False
+
+
+@router.get("/hotels")
+def hotels(
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """
+    Get available hotels and their angles. Validated by an ETag derived from
+    the loaded resort config and its Last-Modified time, so clients can
+    revalidate with If-None-Match / If-Modified-Since and get 304.
+    """
+    version = wrapper.metadata_version()
+    headers = {
+        "ETag": version["etag"],
+        "Last-Modified": formatdate(version["last_modified"], usegmt=True),
+        "Cache-Control": f"private, max-age={metadata_config.get('max_age', 0)}, must-revalidate",
+    }
+    if not_modified(
+        if_none_match, if_modified_since, version["etag"], version["last_modified"]
+    ):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(wrapper.get_hotels(), headers=headers)
+
+
+@router.get("/position")
+def get_position(
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
     """Get current motor position"""
+    status = board_status(wrapper)
+    if status is not None and status["connected"] and status["position"] is not None:
+        return {"position": status["position"]}
     try:
         position = wrapper.get_current_position()
         return {"position": position}
@@ -160,6 +822,210 @@ def get_position(x_api_key: str = Depends(require_api_key)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in [
+        tag[2:] if tag.startswith("W/") else tag for tag in tags
+    ]
+
+
+def conditional_json(content, if_none_match: Optional[str], **headers) -> Response:
+    """JSON response tagged with a content ETag, or 304 if the client has it"""
+    body = json.dumps(content, sort_keys=True, separators=(",", ":")).encode()
+    etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, **headers}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def parse_fields(fields: Optional[List[str]]) -> List[str]:
+    """Snapshot sections from ?fields=a,b or repeated ?fields=a&fields=b"""
+    if not fields:
+        return list(SNAPSHOT_FIELDS)
+    selected = [f.strip() for value in fields for f in value.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in SNAPSHOT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields {unknown}, expected {list(SNAPSHOT_FIELDS)}",
+        )
+    return [f for f in SNAPSHOT_FIELDS if f in selected]
+
+
+@router.get("/snapshot")
+def snapshot(
+    fields: Optional[List[str]] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """
+    Status, health, hotels and position in one response, read together.
+    Select sections with fields=status,hotels; send the returned ETag as
+    If-None-Match to get 304 Not Modified while nothing has changed.
+    """
+    fields = parse_fields(fields)
+    status = None if "health" in fields else board_status(wrapper)
+    if status is None:
+        try:
+            content = wrapper.snapshot(fields)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    else:
+        # Health needs the bus; everything else is on the status board
+        position = status["position"] if status["connected"] else None
+        content = {}
+        if "status" in fields:
+            content["status"] = {
+                "connected": status["connected"],
+                "position": position,
+                "active_hotel": status["active_hotel"] if status["connected"] else None,
+                "queue_depth": status["queue_depth"],
+                "moving": status["moving"],
+                "version": status["version"],
+            }
+        if "hotels" in fields:
+            content["hotels"] = wrapper.get_hotels()
+        if "position" in fields:
+            content["position"] = position
+    return conditional_json(content, if_none_match, **{"Cache-Control": "no-cache"})
+
+
+@router.post("/config/reload")
+def reload_config(
+    wrapper: PlateResortWrapper = Depends(get_wrapper),
+    x_api_key: str = Depends(require_api_key),
+):
+    """
+    Re-read resort_config.yaml now (it is also watched when
+    server.config_reload is enabled) and apply it between moves
+    """
+    try:
+        return wrapper.reload_config()
+    except Exception as e:
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+
+@app.get("/resorts")
+def list_resorts(x_api_key: str = Depends(require_api_key)):
+    """List the resorts served by this process"""
+    return {
+        "default": default_resort,
+        "resorts": {resort_id: w.describe() for resort_id, w in wrappers.items()},
+    }
+
+
+app.include_router(router)
+app.include_router(router, prefix="/resorts/{resort_id}", dependencies=[Depends(resort_path)])
+
+
+def start_daemon(path: str, timeout: float = 30.0):
+    """Start the hardware daemon in a child process and wait for its socket"""
+    import atexit
+    import subprocess
+    import time
+
+    if os.path.exists(path):
+        os.unlink(path)
+    daemon = subprocess.Popen([sys.executable, "-m", "plate_resort.server.daemon"])
+    atexit.register(daemon.terminate)
+
+    start_time = time.time()
+    while not os.path.exists(path):
+        if daemon.poll() is not None:
+            raise RuntimeError("Hardware daemon exited during startup")
+        if time.time() - start_time > timeout:
+            raise RuntimeError(f"Hardware daemon did not open {path}")
+        time.sleep(0.1)
+
+
+def bind_unix_socket(socket_config) -> socket.socket:
+    """Bind the local API socket with the configured mode and group"""
+    path = os.path.expanduser(socket_config["path"])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if os.path.exists(path):
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    os.chmod(path, int(str(socket_config.get("mode", "0660")), 8))
+    if socket_config.get("group"):
+        import grp
+
+        os.chown(path, -1, grp.getgrnam(socket_config["group"]).gr_gid)
+    return sock
+
+
+class LocalSocketApp:
+    """
+    ASGI app for the local Unix socket listener: marks each request so
+    require_api_key can tell it from TCP (uvicorn reports no server address
+    for Unix sockets, the same as some other ASGI servers)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            scope = {**scope, LOCAL_SOCKET_SCOPE: True}
+        await self.app(scope, receive, send)
+
+
+local_app = LocalSocketApp(app)
+
+
+def run_servers(tcp_config, local_config, sockets):
+    """Serve TCP on sockets[0] and the local Unix socket on sockets[1] in one event loop"""
+    import uvicorn
+
+    servers = [uvicorn.Server(tcp_config), uvicorn.Server(local_config)]
+
+    async def serve():
+        tasks = [
+            asyncio.ensure_future(server.serve(sockets=[sock]))
+            for server, sock in zip(servers, sockets)
+        ]
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        # Only one server receives the shutdown signal; stop the other too
+        for server in servers:
+            server.should_exit = True
+        await asyncio.gather(*tasks)
+
+    asyncio.run(serve())
+
+
+def serve_with_unix_socket(host: str, port: int, sock: socket.socket, workers: int = 1):
+    """Serve the API on TCP and the local Unix socket from the same process(es)"""
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    if workers > 1:
+        tcp_config = uvicorn.Config(
+            "plate_resort.server.main:app", host=host, port=port, workers=workers
+        )
+        local_config = uvicorn.Config("plate_resort.server.main:local_app", lifespan="off")
+    else:
+        tcp_config = uvicorn.Config(app, host=host, port=port)
+        local_config = uvicorn.Config(local_app, lifespan="off")
+    path = sock.getsockname()
+    sockets = [tcp_config.bind_socket(), sock]
+    run = functools.partial(run_servers, tcp_config, local_config)
+    try:
+        if workers > 1:
+            Multiprocess(tcp_config, target=run, sockets=sockets).run()
+        else:
+            run(sockets=sockets)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
 def run_server():
     """Entry point for the plate-resort-server command"""
     import uvicorn
@@ -167,16 +1033,39 @@ def run_server():
     host = server_config.get("host", "0.0.0.0")
     port = server_config.get("port", 8000)
     reload = server_config.get("reload", False)  # Default False for production
+    workers = server_config.get("workers", 1)
+    if workers > 1 and not daemon_config.get("enabled"):
+        print("⚠️  workers > 1 needs hardware_daemon.enabled; using 1 worker")
+        workers = 1
+    if workers > 1 and reload:
+        print("⚠️  reload: true runs a single worker; set reload: false to use workers")
+    if daemon_config.get("enabled") and daemon_config.get("autostart", True):
+        start_daemon(socket_path(server_config))
 
     print(f"🚀 Starting Plate Resort Server")
     print(f"📡 Server: http://{host}:{port}")
     print(f"📖 API Docs: http://{host}:{port}/docs")
     print(f"🔑 API Key: {load_api_key()}")
 
-    # Use import string for reload to work properly
-    if reload:
-        uvicorn.run("plate_resort.server.main:app", host=host, port=port,
-                    reload=reload)
+    socket_config = server_config.get("unix_socket") or {}
+    if socket_config.get("path"):
+        if reload:
+            print("⚠️  unix_socket is not served with reload: true; TCP only")
+        else:
+            sock = bind_unix_socket(socket_config)
+            print(f"🔌 Local socket: unix://{sock.getsockname()}")
+            serve_with_unix_socket(host, port, sock, workers)
+            return
+
+    # Use import string for reload and multiple workers to work properly
+    if reload or workers > 1:
+        uvicorn.run(
+            "plate_resort.server.main:app",
+            host=host,
+            port=port,
+            reload=reload,
+            workers=workers,
+        )
     else:
         uvicorn.run(app, host=host, port=port, reload=False)
 
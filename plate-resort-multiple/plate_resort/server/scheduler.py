@@ -0,0 +1,417 @@
+"""
+Rotation-aware scheduling of queued motion requests
+
+The carousel runs in position control mode, so travel between two angles is
+linear (|a - b|) and never wraps past 0°/360°.
+"""
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+POLICIES = ("sstf", "scan", "fifo")
+PRIORITIES = {"critical": 0, "normal": 1, "background": 2}
+
+
+class QueueFullError(Exception):
+    """The motion queue is at capacity"""
+
+    def __init__(self, message, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineError(Exception):
+    """A motion request cannot finish before its deadline"""
+
+
+class MotionTicket:
+    """A motion request waiting for (or holding) the motor"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, key, target_angle: float, priority="normal", deadline=None):
+        self.id = next(self._ids)
+        self.key = key
+        self.target_angle = target_angle
+        self.submitted = time.time()
+        self.priority = priority
+        self.deadline = None if deadline is None else self.submitted + deadline
+        self.started = None
+        self.finished = None
+        self.from_angle = None
+        self.cancel = threading.Event()
+        self.preemptible = False
+        self.timed = True
+        self.hold_started = None
+        self.hold_timeout = None
+        self.held = 0.0
+        self.result = None
+        self.error = None
+        self.shared = 0
+
+
+class MotionScheduler:
+    """
+    Serialise motor moves and pick the next pending request by policy.
+
+    Policies:
+        sstf: shortest travel from the current position first; every second
+              spent waiting counts as `aging` degrees less travel so distant
+              requests are not starved
+        scan: elevator sweep, serving targets in the current direction of
+              travel before reversing
+        fifo: arrival order
+
+    Requests are first ordered by priority class, then earliest deadline
+    first, and only requests without a deadline are ordered by policy.
+    """
+
+    def __init__(self, policy="sstf", aging=10.0, default_move_time=2.0, max_queue=32,
+                 estimate: Optional[Callable[[float, float], float]] = None,
+                 locate: Optional[Callable[[], Optional[float]]] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduler policy {policy}. Available: {POLICIES}")
+        self.policy = policy
+        self.aging = aging
+        self.avg_move_time = default_move_time
+        self.avg_hold_time = None
+        self.max_queue = max_queue
+        self.estimate = estimate
+        # Last known motor angle, read after each job
+        self.locate = locate
+        self.position = None
+        self.direction = 1
+        self.moves_completed = 0
+        self.degrees_travelled = 0.0
+        self._cond = threading.Condition()
+        self._pending: List[MotionTicket] = []
+        self._active: Optional[MotionTicket] = None
+
+    def run(self, key, target_angle: float, func: Callable[[threading.Event], Any],
+            priority="normal", deadline=None, cancel=None, timed=True) -> Dict[str, Any]:
+        """
+        Wait for this request's turn on the motor, then execute it
+
+        A request whose key matches a pending or in-flight move is attached to
+        that move instead of queueing its own, and shares its outcome; its
+        deadline is checked against that move.
+
+        Args:
+            key: Identifier of the move target (e.g. ("hotel", "A"))
+            target_angle: Target angle in degrees, used for ordering
+            func: Callable performing the move, passed the ticket's cancel
+                event which it should poll to stop early
+            priority: Priority class ("critical", "normal" or "background")
+            deadline: Seconds from now by which the move must finish
+            cancel: threading.Event marking the move as preemptible; it is
+                set as soon as any other request is queued. Non-preemptible
+                moves get their own event, set only by cancel_active()
+            timed: Count the job's duration (less any hold) towards
+                avg_move_time; False for jobs that are not a single move,
+                such as config reloads and calibration
+
+        Returns:
+            dict: Result of func ("reached"), whether the request was
+                coalesced, seconds waited in the queue and move duration
+
+        Raises:
+            QueueFullError: If max_queue requests are already pending
+            DeadlineError: If the estimated queue drain time exceeds deadline
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority}. Available: {list(PRIORITIES)}")
+
+        with self._cond:
+            ticket = self._find(key)
+            coalesced = ticket is not None
+            if coalesced:
+                if deadline is not None:
+                    now = time.time()
+                    order = min(self._order(ticket), (PRIORITIES[priority], now + deadline))
+                    self._check_deadline(deadline, self._expected_finish(ticket, order, now))
+                ticket.shared += 1
+                if ticket.started is None:
+                    self._promote(ticket, priority, deadline)
+                while ticket.finished is None:
+                    self._cond.wait()
+            else:
+                ticket = MotionTicket(key, target_angle, priority, deadline)
+                ticket.timed = timed
+                if cancel is not None:
+                    ticket.cancel = cancel
+                    ticket.preemptible = True
+                self._admit(ticket)
+                if self._active is not None and self._active.preemptible:
+                    self._active.cancel.set()
+                self._pending.append(ticket)
+                self._dispatch()
+                while self._active is not ticket:
+                    self._cond.wait()
+
+        if not coalesced:
+            try:
+                ticket.result = func(ticket.cancel)
+            except Exception as e:
+                ticket.error = e
+            finally:
+                with self._cond:
+                    self._finish(ticket)
+
+        if ticket.error is not None:
+            raise ticket.error
+        return {
+            "reached": ticket.result,
+            "coalesced": coalesced,
+            "shared_with": ticket.shared,
+            "waited": ticket.started - ticket.submitted,
+            "duration": ticket.finished - ticket.started,
+        }
+
+    def _find(self, key) -> Optional[MotionTicket]:
+        """Pending or in-flight ticket for the same target (caller holds _cond)"""
+        if self._active is not None and self._active.key == key:
+            return self._active
+        for ticket in self._pending:
+            if ticket.key == key:
+                return ticket
+        return None
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for the motor"""
+        return len(self._pending)
+
+    def _admit(self, ticket: MotionTicket):
+        """Apply queue capacity and deadline admission (caller holds _cond)"""
+        if len(self._pending) >= self.max_queue:
+            raise QueueFullError(
+                f"Motion queue full ({self.max_queue} pending)",
+                retry_after=self._active_remaining(ticket.submitted) or self.avg_move_time,
+            )
+
+        if ticket.deadline is None:
+            return
+        self._check_deadline(
+            ticket.deadline - ticket.submitted,
+            self._expected_finish(ticket, self._order(ticket), ticket.submitted),
+        )
+
+    def _expected_finish(self, ticket: MotionTicket, order, now) -> float:
+        """
+        Expected seconds until ticket finishes if it were queued at order
+        (caller holds _cond)
+        """
+        if ticket is self._active:
+            return self._active_remaining(now)
+        ahead = sorted(
+            (t for t in self._pending if t is not ticket and self._order(t) < order),
+            key=self._order,
+        )
+        finish = self._active_remaining(now)
+        position = self._active.target_angle if self._active else self.position
+        for t in ahead + [ticket]:
+            finish += self._move_time(position, t.target_angle)
+            position = t.target_angle
+        return finish
+
+    @staticmethod
+    def _check_deadline(deadline: float, finish: float):
+        if finish > deadline:
+            raise DeadlineError(
+                f"Deadline of {deadline:.1f}s cannot be met "
+                f"(estimated completion in {finish:.1f}s)"
+            )
+
+    def _promote(self, ticket: MotionTicket, priority, deadline):
+        """Raise a pending ticket to the most urgent of its requesters"""
+        if PRIORITIES[priority] < PRIORITIES[ticket.priority]:
+            ticket.priority = priority
+        if deadline is not None:
+            deadline = time.time() + deadline
+            if ticket.deadline is None or deadline < ticket.deadline:
+                ticket.deadline = deadline
+
+    @staticmethod
+    def _order(ticket: MotionTicket):
+        """Sort key for priority class then earliest deadline"""
+        deadline = ticket.deadline if ticket.deadline is not None else float("inf")
+        return (PRIORITIES[ticket.priority], deadline)
+
+    def _move_time(self, from_angle, to_angle) -> float:
+        """Expected seconds for a move, falling back to the observed average"""
+        if self.estimate is None or from_angle is None:
+            return self.avg_move_time
+        return self.estimate(from_angle, to_angle)
+
+    def _active_remaining(self, now) -> float:
+        """Expected seconds until the running move (or its hold) finishes"""
+        active = self._active
+        if active is None or active.started is None:
+            return 0.0
+        if active.hold_started is not None:
+            # Until the first hold is observed, expect it to run to its timeout
+            expected = active.hold_timeout
+            if self.avg_hold_time is not None:
+                expected = min(self.avg_hold_time, expected)
+            return max(expected - (now - active.hold_started), 0.0)
+        expected = self._move_time(active.from_angle, active.target_angle)
+        return max(expected - (now - active.started - active.held), 0.0)
+
+    @property
+    def busy(self) -> bool:
+        """True while a move is running or queued"""
+        return self._active is not None or bool(self._pending)
+
+    @property
+    def active_target(self) -> Optional[float]:
+        """Target angle of the running move, None when idle"""
+        active = self._active
+        return active.target_angle if active is not None else None
+
+    def when_idle(self, func: Callable[[], Any]) -> Any:
+        """
+        Call func while no move is running or queued; requests arriving
+        meanwhile wait until it returns
+
+        Returns:
+            func's result, or None if the motor is busy
+        """
+        with self._cond:
+            if self.busy:
+                return None
+            return func()
+
+    def begin_hold(self, timeout: float):
+        """
+        Mark the running job as holding the motor in place, e.g. while a
+        retrieval waits for release, for at most timeout seconds
+        """
+        with self._cond:
+            if self._active is not None:
+                self._active.hold_started = time.time()
+                self._active.hold_timeout = timeout
+
+    def end_hold(self):
+        """End the running job's hold, learning how long holds last"""
+        with self._cond:
+            active = self._active
+            if active is None or active.hold_started is None:
+                return
+            held = time.time() - active.hold_started
+            active.held += held
+            active.hold_started = None
+            if self.avg_hold_time is None:
+                self.avg_hold_time = held
+            else:
+                self.avg_hold_time = 0.8 * self.avg_hold_time + 0.2 * held
+
+    def cancel_active(self) -> bool:
+        """
+        Set the running move's cancel event, e.g. after an emergency stop
+
+        Returns:
+            bool: True if a move was running
+        """
+        with self._cond:
+            if self._active is None:
+                return False
+            self._active.cancel.set()
+            return True
+
+    def update_position(self, angle: float):
+        """Record a freshly read motor position"""
+        with self._cond:
+            self.position = angle
+
+    def _finish(self, ticket: MotionTicket):
+        ticket.finished = time.time()
+        # A timed out, cancelled or failed move stops short of its target
+        position = self.locate() if self.locate is not None else None
+        if position is None:
+            position = ticket.target_angle
+        if self.position is not None:
+            self.degrees_travelled += abs(position - self.position)
+        self.position = position
+        self.moves_completed += 1
+        if ticket.timed:
+            duration = ticket.finished - ticket.started - ticket.held
+            self.avg_move_time = 0.8 * self.avg_move_time + 0.2 * duration
+        self._active = None
+        self._cond.notify_all()
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand the motor to the next pending ticket (caller holds _cond)"""
+        if self._active is not None or not self._pending:
+            return
+        ticket = self._select(self._pending, self.position, self.direction, time.time())
+        if self.position is not None and ticket.target_angle != self.position:
+            self.direction = 1 if ticket.target_angle > self.position else -1
+        self._pending.remove(ticket)
+        self._active = ticket
+        ticket.started = time.time()
+        ticket.from_angle = self.position
+        self._cond.notify_all()
+
+    def _select(self, pending, position, direction, now) -> MotionTicket:
+        most_urgent = min(self._order(t) for t in pending)
+        pending = [t for t in pending if self._order(t) == most_urgent]
+        if len(pending) == 1:
+            return pending[0]
+
+        if self.policy == "fifo" or position is None:
+            return min(pending, key=lambda t: t.id)
+
+        if self.policy == "scan":
+            ahead = [t for t in pending if (t.target_angle - position) * direction >= 0]
+            if not ahead:
+                ahead = pending
+            return min(ahead, key=lambda t: (abs(t.target_angle - position), t.id))
+
+        return min(
+            pending,
+            key=lambda t: (abs(t.target_angle - position) - self.aging * (now - t.submitted), t.id),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and expected wait for each pending request"""
+        with self._cond:
+            now = time.time()
+            queue = []
+            wait = self._active_remaining(now)
+
+            # Replay the policy to predict service order
+            pending = list(self._pending)
+            position = self._active.target_angle if self._active else self.position
+            direction = self.direction
+            while pending:
+                ticket = self._select(pending, position, direction, now)
+                pending.remove(ticket)
+                queue.append({
+                    "id": ticket.id,
+                    "target": ticket.key,
+                    "target_angle": ticket.target_angle,
+                    "waited": now - ticket.submitted,
+                    "shared": ticket.shared,
+                    "priority": ticket.priority,
+                    "deadline": None if ticket.deadline is None else ticket.deadline - now,
+                    "expected_wait": wait,
+                })
+                if position is not None and ticket.target_angle != position:
+                    direction = 1 if ticket.target_angle > position else -1
+                wait += self._move_time(position, ticket.target_angle)
+                position = ticket.target_angle
+
+            return {
+                "policy": self.policy,
+                "queue_depth": len(self._pending),
+                "max_queue": self.max_queue,
+                "active": self._active.key if self._active else None,
+                "expected_wait": wait,
+                "avg_move_time": self.avg_move_time,
+                "avg_hold_time": self.avg_hold_time,
+                "moves_completed": self.moves_completed,
+                "degrees_travelled": self.degrees_travelled,
+                "pending": queue,
+            }
@@ -0,0 +1,197 @@
+"""
+Durable SQLite state for the server: plate inventory, move history and
+last known position
+
+Writes are queued and committed in batches by a background thread so they
+never add latency to request handlers.
+"""
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plates (
+    plate_id TEXT PRIMARY KEY,
+    hotel TEXT NOT NULL,
+    room INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS plates_slot ON plates (hotel, room);
+CREATE TABLE IF NOT EXISTS moves (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    target TEXT NOT NULL,
+    target_angle REAL,
+    reached INTEGER,
+    waited REAL,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS moves_ts ON moves (ts);
+CREATE INDEX IF NOT EXISTS moves_target ON moves (target, ts);
+CREATE TABLE IF NOT EXISTS access (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (kind, name)
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+PUT_PLATE = "INSERT OR REPLACE INTO plates (plate_id, hotel, room, updated) VALUES (?, ?, ?, ?)"
+DELETE_PLATE = "DELETE FROM plates WHERE plate_id = ?"
+INSERT_MOVE = (
+    "INSERT INTO moves (ts, target, target_angle, reached, waited, duration) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+COUNT_ACCESS = (
+    "INSERT INTO access (kind, name, count) VALUES (?, ?, 1) "
+    "ON CONFLICT (kind, name) DO UPDATE SET count = count + 1"
+)
+PUT_STATE = "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)"
+
+
+class StateStore:
+    """SQLite (WAL mode) store with asynchronous batched writes"""
+
+    def __init__(self, path: str, flush_interval: float = 0.5, batch_size: int = 200):
+        path = os.path.expanduser(path)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue: "queue.Queue" = queue.Queue()
+        self._read_lock = threading.Lock()
+
+        self._writer = self._open()
+        self._writer.executescript(SCHEMA)
+        self._reader = self._open()
+
+        self._thread = threading.Thread(target=self._run, name="state-store", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # Queued writes
+
+    def put_plate(self, plate_id: str, hotel: str, room: int):
+        self._queue.put((PUT_PLATE, (plate_id, hotel, room, time.time())))
+
+    def delete_plate(self, plate_id: str):
+        self._queue.put((DELETE_PLATE, (plate_id,)))
+
+    def record_move(self, target: str, target_angle: float, result: Dict[str, Any]):
+        self._queue.put((INSERT_MOVE, (
+            time.time(), target, target_angle, result.get("reached"),
+            result.get("waited"), result.get("duration"),
+        )))
+
+    def record_access(self, kind: str, name: str):
+        """Count one access to a hotel or plate (kind "hotel" or "plate")"""
+        self._queue.put((COUNT_ACCESS, (kind, name)))
+
+    def set_state(self, key: str, value):
+        self._queue.put((PUT_STATE, (key, None if value is None else str(value))))
+
+    def _run(self):
+        while True:
+            ops = [self._queue.get()]
+            deadline = time.time() + self.flush_interval
+            while len(ops) < self.batch_size:
+                try:
+                    ops.append(self._queue.get(timeout=max(deadline - time.time(), 0)))
+                except queue.Empty:
+                    break
+            stop = None in ops
+            self._commit([op for op in ops if op is not None])
+            for _ in ops:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _commit(self, ops):
+        """Write a batch in one transaction, grouping consecutive identical statements"""
+        if not ops:
+            return
+        try:
+            self._writer.execute("BEGIN")
+            i = 0
+            while i < len(ops):
+                sql = ops[i][0]
+                j = i
+                while j < len(ops) and ops[j][0] == sql:
+                    j += 1
+                self._writer.executemany(sql, [params for _, params in ops[i:j]])
+                i = j
+            self._writer.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._writer.execute("ROLLBACK")
+            print(f"⚠️  State store batch write failed ({e}), retrying {len(ops)} updates singly")
+            self._commit_each(ops)
+
+    def _commit_each(self, ops):
+        """Write each update in its own transaction, dropping only those that fail"""
+        for sql, params in ops:
+            try:
+                self._writer.execute(sql, params)
+            except sqlite3.Error as e:
+                print(f"⚠️  State store update dropped: {e} ({params})")
+
+    def flush(self):
+        """Block until all queued writes are committed"""
+        self._queue.join()
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    # Reads
+
+    def load_plates(self) -> Dict[str, tuple]:
+        """Return plate_id -> (hotel, room) for all stored plates"""
+        with self._read_lock:
+            rows = self._reader.execute("SELECT plate_id, hotel, room FROM plates").fetchall()
+        return {plate_id: (hotel, room) for plate_id, hotel, room in rows}
+
+    def load_access(self, kind: str) -> Dict[str, int]:
+        """Return name -> access count for hotels or plates"""
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT name, count FROM access WHERE kind = ?", (kind,)
+            ).fetchall()
+        return dict(rows)
+
+    def get_state(self, key: str) -> Optional[str]:
+        with self._read_lock:
+            row = self._reader.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def recent_moves(self, limit: int = 50, target: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent moves first, optionally for one target"""
+        sql = "SELECT ts, target, target_angle, reached, waited, duration FROM moves"
+        params: tuple = ()
+        if target is not None:
+            sql += " WHERE target = ?"
+            params = (target,)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        with self._read_lock:
+            rows = self._reader.execute(sql, params + (limit,)).fetchall()
+        return [
+            {"ts": ts, "target": t, "target_angle": angle, "reached": bool(reached),
+             "waited": waited, "duration": duration}
+            for ts, t, angle, reached, waited, duration in rows
+        ]
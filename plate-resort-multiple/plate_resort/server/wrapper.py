@@ -1,9 +1,19 @@
+import hashlib
+import json
 import os
+import queue
 import threading
+import time
+import uuid
 import yaml
 import configparser
-from typing import Dict, Any, Optional
-from fastapi import Header, HTTPException
+from typing import Dict, Any, Iterator, List, Optional
+from fastapi import Header, HTTPException, Request
+
+from .board import StatusBoard, board_path
+from .idempotency import IdempotencyCache
+from .scheduler import MotionScheduler, QueueFullError
+from .store import StateStore
 
 
 def load_api_key():
@@ -48,8 +58,16 @@ def load_api_key():
         return 'changeme'
 
 
-def require_api_key(x_api_key: str = Header(None)):
-    """Validate API key from header"""
+# Scope key set on requests that arrived over the local Unix socket listener
+LOCAL_SOCKET_SCOPE = "plate_resort.local_socket"
+
+
+def require_api_key(request: Request, x_api_key: str = Header(None)):
+    """Validate API key from header (not required over the local Unix socket)"""
+    # Requests over the local Unix socket are authorized by the socket's
+    # file permissions
+    if request.scope.get(LOCAL_SOCKET_SCOPE):
+        return x_api_key
     expected = load_api_key()
     if x_api_key != expected:
         raise HTTPException(
@@ -59,40 +77,268 @@ def require_api_key(x_api_key: str = Header(None)):
     return x_api_key
 
 
+# Position jitter (degrees) below this does not count as a state change
+POSITION_RESOLUTION = 0.05
+
+# Mutating methods that accept an Idempotency-Key
+IDEMPOTENT_METHODS = {
+    "connect", "disconnect", "activate_hotel", "go_home", "move_to_angle",
+    "place_plate", "remove_plate", "activate_plate", "release_retrieval",
+    "set_speed", "emergency_stop", "calibrate", "clear_calibration",
+}
+
+# Sections of a snapshot(), in response order
+SNAPSHOT_FIELDS = ("status", "health", "hotels", "position")
+
+
+class RetrievalJob:
+    """A bulk retrieval visiting each hotel once and waiting for release"""
+
+    def __init__(self, stops: List[Dict[str, Any]]):
+        self.id = uuid.uuid4().hex[:12]
+        self.stops = stops
+        self.events: "queue.Queue" = queue.Queue()
+        self.release = threading.Event()
+        # Set when nobody is reading the events any more
+        self.abort = threading.Event()
+
+
+def wait_conditions(state, idle, hotel, angle, tolerance, version) -> bool:
+    """True when every requested /wait condition holds"""
+    if idle and state["moving"]:
+        return False
+    if hotel is not None and (state["moving"] or state["active_hotel"] != hotel):
+        return False
+    if angle is not None and (
+        state["position"] is None or abs(state["position"] - angle) > tolerance
+    ):
+        return False
+    if version is not None and state["version"] <= version:
+        return False
+    return True
+
+
+def wait_result(state, met: bool, waited: float) -> Dict[str, Any]:
+    """/wait response from the motion state it ended on"""
+    return {
+        "met": met,
+        "waited": waited,
+        **{key: state[key] for key in ("connected", "moving", "active_hotel", "position")},
+        "version": state["version"],
+    }
+
+
 class PlateResortWrapper:
     """Thread-safe wrapper around PlateResort for API access"""
     
-    def __init__(self):
+    def __init__(self, server_config=None, resort_overrides=None, resort_id="default"):
         self.lock = threading.Lock()
         self.resort = None
         self.connected = False
-        self._load_resort_class()
+        self.server_config = server_config or {}
+        self.resort_id = resort_id
+        self._load_resort_class(resort_overrides or {})
+        self.scheduler = MotionScheduler(
+            estimate=self.resort.estimator.estimate,
+            locate=lambda: self.resort.last_position,
+            **self.server_config.get("scheduler", {}),
+        )
+        self.jobs: Dict[str, RetrievalJob] = {}
+        self.idempotency = IdempotencyCache(**self.server_config.get("idempotency", {}))
+        self.store = None
+        if self.server_config.get("state_db"):
+            self.store = StateStore(self.server_config["state_db"])
+            self._restore_state()
+        self.last_request = time.time()
+        self.version = 0
+        self._version_lock = threading.Lock()
+        self._versioned_state = None
+        self._versioned_position = None
+        self.board = None
+        board_config = self.server_config.get("status_board") or {}
+        if board_config.get("enabled"):
+            self.board = StatusBoard(board_path(board_config, resort_id), writer=True)
+            self._publish_status()
+            threading.Thread(
+                target=self._board_loop,
+                args=(board_config.get("interval", 0.1), board_config.get("health_interval", 5.0)),
+                daemon=True,
+            ).start()
+        # When the file applied by the last reload was read
+        self._config_read_at = float("-inf")
+        reload_config = self.server_config.get("config_reload") or {}
+        if reload_config.get("enabled"):
+            threading.Thread(
+                target=self._config_watch_loop,
+                args=(reload_config.get("interval", 1.0),),
+                daemon=True,
+            ).start()
+        # Started last: parking moves publish status and bump the version
+        parking = self.server_config.get("idle_parking", {})
+        if parking.get("enabled"):
+            threading.Thread(
+                target=self._idle_parking_loop,
+                args=(parking.get("quiet_period", 30), parking.get("min_observations", 5)),
+                daemon=True,
+            ).start()
     
-    def _load_resort_class(self):
-        """Lazy load PlateResort class"""
+    def _load_resort_class(self, overrides):
+        """Lazy load PlateResort class, overriding resort config values"""
         try:
             import sys
             import os
             sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
             from plate_resort import PlateResort
-            self.resort = PlateResort()
+            self.config_file = os.path.abspath("resort_config.yaml")
+            self.resort = PlateResort(self.config_file, **overrides)
         except ImportError as e:
             raise RuntimeError(f"Failed to import PlateResort: {e}")
+        self._tag_metadata()
+
+    def _tag_metadata(self):
+        """Validator for the hotel metadata, derived from the loaded config"""
+        digest = hashlib.sha1(
+            json.dumps(self.resort.config, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        try:
+            modified = os.path.getmtime(self.config_file)
+        except OSError:
+            modified = time.time()
+        self.metadata = {"etag": f'"{digest[:20]}"', "last_modified": int(modified)}
+
+    def _read_config(self):
+        """Load, validate and derive the layout of the resort config file"""
+        try:
+            with open(self.config_file) as f:
+                config = yaml.safe_load(f) or {}
+            overrides = resort_overrides(config, self.resort_id)
+            resort_config = self.resort.with_overrides(config["resort"], overrides)
+        except (OSError, yaml.YAMLError, KeyError, TypeError) as e:
+            raise ValueError(f"Cannot load {self.config_file}: {e}")
+        return resort_config, self.resort.derive_layout(resort_config)
+
+    def reload_config(self) -> Dict[str, Any]:
+        """
+        Re-read the resort config file and switch to it between moves
 
-    def connect(self, device="/dev/ttyUSB0", baudrate=57600, motor_id=1):
-        """Connect to motor with thread safety"""
+        The new version is validated first; the swap itself runs as a queued
+        job on the scheduler, so it never writes registers during a move or
+        while a retrieval holds the motor. The job reads the file again when
+        it runs, and a reload that joins a swap which read the file before
+        the reload was requested queues another, so the latest file always
+        wins. Server settings and the list of resorts still need a
+        restart.
+
+        Returns:
+            dict: 'changed' config keys and motor 'registers' written
+
+        Raises:
+            ValueError: If the file cannot be read or the config is invalid
+            QueueFullError: If the motion queue is at capacity
+        """
+        self._read_config()
+        requested = time.monotonic()
+
+        def swap(cancel):
+            read_at = time.monotonic()
+            resort_config, layout = self._read_config()
+            with self.lock:
+                result = self.resort.apply_config(resort_config, layout)
+            self._config_read_at = read_at
+            return result
+
+        # Target the current position so the swap is ordered as a zero-travel job
+        position = self.scheduler.position
+        if position is None:
+            position = self.resort.last_position or 0.0
+        while True:
+            result = self.scheduler.run(("reload",), position, swap, timed=False)["reached"]
+            # A reload joined after the running swap had read the file: go again
+            if self._config_read_at >= requested:
+                break
+        self._save_calibration()
+        self._tag_metadata()
+        self._publish_status()
+        return result
+
+    def _config_watch_loop(self, interval):
+        """Reload the resort config whenever its file changes"""
+        def stamp():
+            try:
+                stat = os.stat(self.config_file)
+                return stat.st_mtime_ns, stat.st_size
+            except OSError:
+                return None
+
+        last = stamp()
+        while True:
+            time.sleep(interval)
+            current = stamp()
+            if current is None or current == last:
+                continue
+            try:
+                result = self.reload_config()
+            except QueueFullError:
+                continue  # Retried on the next poll
+            except Exception as e:
+                last = current
+                # Half-written files are retried on the next change
+                print(f"⚠️  Config reload rejected for resort {self.resort_id}: {e}")
+                continue
+            last = current
+            if result["changed"]:
+                print(f"🔄 Resort {self.resort_id} reloaded {result['changed']}, "
+                      f"registers written: {result['registers']}")
+
+    def metadata_version(self) -> Dict[str, Any]:
+        """ETag and Last-Modified (epoch seconds) of the hotel metadata"""
+        return self.metadata
+
+    def _restore_state(self):
+        """Reload inventory and last known hotel and position from the state store"""
+        for plate_id, (hotel, room) in self.store.load_plates().items():
+            try:
+                self.resort.inventory.place(plate_id, hotel, room)
+            except ValueError as e:
+                # Slot no longer configured; the row stays until the plate is placed again
+                print(f"⚠️  Stored plate {plate_id} not restored: {e}")
+        self.resort.inventory.hotel_hits.update(self.store.load_access("hotel"))
+        self.resort.inventory.plate_hits.update(self.store.load_access("plate"))
+        for transition, count in self.store.load_access("transition").items():
+            previous, hotel = transition.split(">", 1)
+            self.resort.inventory.transitions[previous][hotel] = count
+        last_hotel = self.store.get_state("last_hotel")
+        if last_hotel in self.resort.hotels:
+            self.resort.current_hotel = last_hotel
+        last_position = self.store.get_state("last_position")
+        if last_position is not None:
+            self.resort.last_position = float(last_position)
+            self.scheduler.update_position(self.resort.last_position)
+        calibration = json.loads(self.store.get_state("calibration") or "{}")
+        self.resort.calibration = {
+            hotel: entry for hotel, entry in calibration.items()
+            if self.resort.hotel_ticks.get(hotel) == entry.get("goal_position")
+        }
+
+    def connect(self, device=None, baudrate=None, motor_id=None):
+        """Connect to motor with thread safety (configured values if None)"""
         with self.lock:
             if not self.connected and self.resort:
-                # Update config if different from defaults
-                if (device != "/dev/ttyUSB0" or 
-                    baudrate != 57600 or 
-                    motor_id != 1):
+                if device is not None:
                     self.resort.device = device
+                if baudrate is not None:
                     self.resort.baud = baudrate
+                if motor_id is not None:
                     self.resort.motor_id = motor_id
                 
                 self.resort.connect()
                 self.connected = True
+        self._publish_status()
+
+    def discover(self, baudrates=None) -> List[Dict[str, Any]]:
+        """Broadcast ping the bus, optionally scanning baud rates while disconnected"""
+        with self.lock:
+            return self.resort.discover(baudrates)
 
     def disconnect(self):
         """Disconnect from motor"""
@@ -100,6 +346,7 @@ class PlateResortWrapper:
             if self.connected and self.resort:
                 self.resort.disconnect()
                 self.connected = False
+        self._publish_status()
 
     def status(self) -> Dict[str, Any]:
         """Get current system status"""
@@ -111,16 +358,20 @@ class PlateResortWrapper:
                 "connected": self.connected,
                 "position": None,
                 "active_hotel": None,
+                "queue_depth": self.scheduler.queue_depth,
+                "moving": self.scheduler.busy,
             }
             
             if self.connected:
                 try:
                     status["position"] = self.resort.get_current_position()
+                    self.scheduler.update_position(status["position"])
                     status["active_hotel"] = getattr(self.resort, "current_hotel", None)
                 except Exception as e:
                     status["error"] = str(e)
             
-            return status
+        status["version"] = self.motion_state()["version"]
+        return status
 
     def get_motor_health(self) -> Dict[str, Any]:
         """Get motor health diagnostics"""
@@ -132,42 +383,511 @@ class PlateResortWrapper:
                 return {"error": "resort not initialized"}
             
             try:
-                return self.resort.get_motor_health()
+                health = self.resort.get_motor_health()
             except Exception as e:
                 return {"error": str(e)}
+        self._publish_status(**self._health_fields(health))
+        return health
+
+    @staticmethod
+    def _health_fields(health: Dict[str, Any]) -> Dict[str, Any]:
+        """Status board fields from a get_motor_health() reading"""
+        return {
+            "temperature": health.get("temperature"),
+            "voltage": health.get("voltage"),
+            "current": health.get("current"),
+            "hardware_error": health.get("hardware_error"),
+            "health_updated": time.time(),
+        }
+
+    def motion_state(self) -> Dict[str, Any]:
+        """
+        Last known motion state without touching the bus or the lock
+
+        'version' increases whenever connection, motion, queue, active hotel
+        or position (beyond POSITION_RESOLUTION) changes.
+        """
+        state = {
+            "connected": self.connected,
+            "moving": self.scheduler.busy,
+            "active_hotel": self.resort.current_hotel,
+            "position": self.resort.last_position,
+            "target": self.scheduler.active_target,
+            "queue_depth": self.scheduler.queue_depth,
+        }
+        with self._version_lock:
+            position = state["position"]
+            key = tuple(v for k, v in state.items() if k != "position")
+            moved = (position is None) != (self._versioned_position is None) or (
+                position is not None
+                and abs(position - self._versioned_position) >= POSITION_RESOLUTION
+            )
+            if key != self._versioned_state or moved:
+                self.version += 1
+                self._versioned_state = key
+                self._versioned_position = position
+            state["version"] = self.version
+        return state
+
+    def wait(self, idle=False, hotel=None, angle=None, tolerance=None, version=None,
+             timeout=30.0) -> Dict[str, Any]:
+        """
+        Block until every given /wait condition holds or timeout seconds pass
 
-    def activate_hotel(self, hotel: str):
+        Raises:
+            KeyError: If hotel is not a hotel of this resort
+        """
+        if hotel is not None and hotel not in self.resort.hotels:
+            raise KeyError(hotel)
+        if tolerance is None:
+            tolerance = self.resort.config["position_tolerance"]
+        interval = (self.server_config.get("wait") or {}).get("poll_interval", 0.05)
+
+        start = time.time()
+        while True:
+            state = self.motion_state()
+            met = wait_conditions(state, idle, hotel, angle, tolerance, version)
+            waited = time.time() - start
+            if met or waited >= timeout:
+                return wait_result(state, met, waited)
+            time.sleep(min(interval, timeout - waited))
+
+    def _publish_status(self, **changes):
+        """Update the state version and publish to the status board, if enabled"""
+        state = self.motion_state()
+        if self.board is not None:
+            self.board.publish(**state, **changes)
+
+    def _board_loop(self, interval, health_interval):
+        """
+        Keep the status board fresh. The bus is only read when no move holds
+        the lock; during a move the position polled by the move itself is
+        published instead.
+        """
+        next_health = 0.0
+        while True:
+            time.sleep(interval)
+            health = {}
+            if self.connected and self.lock.acquire(blocking=False):
+                try:
+                    self.resort.get_current_position()
+                    if time.time() >= next_health and not self.scheduler.busy:
+                        next_health = time.time() + health_interval
+                        health = self._health_fields(self.resort.get_motor_health())
+                except Exception:
+                    pass  # Readers see the last published values age
+                finally:
+                    self.lock.release()
+            self._publish_status(**health)
+
+    def _require_connection(self):
+        """Raise if the motor cannot accept commands"""
+        if not self.connected:
+            raise RuntimeError("Not connected to motor")
+
+        if not self.resort:
+            raise RuntimeError("Resort not initialized")
+
+    def _scheduled_move(self, key, target_angle, func, priority="normal", deadline=None,
+                        cancel=None, timed=True):
+        """
+        Queue a move on the scheduler and run it under the lock
+
+        func is passed the move's cancel event, set by emergency_stop() (or,
+        for a preemptible move, by the next request).
+        """
+        if cancel is None:
+            self.last_request = time.time()
+
+        def move(cancel):
+            with self.lock:
+                self._require_connection()
+                self._publish_status()
+                return func(cancel)
+
+        result = self.scheduler.run(key, target_angle, move, priority, deadline, cancel, timed)
+        self._publish_status()
+        if self.store and not result["coalesced"]:
+            self.store.record_move(":".join(str(k) for k in key), target_angle, result)
+            self.store.set_state("last_hotel", self.resort.current_hotel)
+            self.store.set_state("last_position", self.resort.last_position)
+        return result
+
+    def _idle_parking_loop(self, quiet_period, min_observations):
+        """
+        Once requests have been quiet for quiet_period seconds, pre-rotate to
+        the hotel most often requested after the last one. The park move is
+        preemptible and is abandoned as soon as a real request is queued.
+        """
+        parked_for = None
+        while True:
+            time.sleep(min(quiet_period, 1.0))
+            idle_since = self.last_request
+            if (not self.connected or self.scheduler.busy or parked_for == idle_since
+                    or time.time() - idle_since < quiet_period):
+                continue
+            parked_for = idle_since
+
+            prediction = self.resort.inventory.predict_next(
+                self.resort.inventory.last_hotel, min_observations
+            )
+            if prediction is None or prediction[0] == self.resort.current_hotel:
+                continue
+            hotel = prediction[0]
+            cancel = threading.Event()
+            print(f"Idle parking at hotel {hotel} (p={prediction[1]:.2f})")
+            try:
+                self._scheduled_move(
+                    ("park", hotel),
+                    self.resort.hotel_angles[hotel],
+                    lambda cancel: self.resort.activate_hotel(hotel, cancel=cancel),
+                    "background",
+                    None,
+                    cancel,
+                )
+            except Exception as e:
+                print(f"⚠️  Idle parking failed: {e}")
+
+    def _settled_at(self, hotel: str) -> bool:
+        """
+        True if the hotel is already active and nothing is moving
+
+        Checked through the scheduler so no move can be dispatched between
+        the check and its answer. The position read skips the move lock (no
+        move runs while idle); the bus lock orders it with status polls.
+        """
+        def check():
+            if self.resort.current_hotel != hotel:
+                return False
+            position = self.resort.get_current_position()
+            self.scheduler.update_position(position)
+            error = abs(position - self.resort.hotel_angles[hotel])
+            return error <= self.resort.config['position_tolerance']
+
+        return bool(self.scheduler.when_idle(check))
+
+    def _plan(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the expected queue wait to a dry-run move plan"""
+        plan["expected_wait"] = self.scheduler.stats()["expected_wait"]
+        plan["eta"] = plan["expected_wait"] + plan["duration"]
+        return plan
+
+    def _record_access(self, hotel: Optional[str] = None, plate_ids=()):
+        """Count hotel and plate accesses for placement and idle parking"""
+        previous = self.resort.inventory.last_hotel
+        self.resort.inventory.record_access(hotel, plate_ids)
+        if self.store:
+            if hotel is not None:
+                self.store.record_access("hotel", hotel)
+                if previous is not None and previous != hotel:
+                    self.store.record_access("transition", f"{previous}>{hotel}")
+            for plate_id in plate_ids:
+                self.store.record_access("plate", plate_id)
+
+    def activate_hotel(self, hotel: str, priority="normal", deadline=None, dry_run=False):
         """Move to specified hotel"""
+        if dry_run:
+            return self._plan(self.resort.activate_hotel(hotel, dry_run=True))
+
+        self._require_connection()
+        if hotel not in self.resort.hotels:
+            raise ValueError(f"Hotel {hotel} not found. Available: {self.resort.hotels}")
+
+        self._record_access(hotel)
+        if self._settled_at(hotel):
+            return {"reached": True, "coalesced": True, "shared_with": 0,
+                    "waited": 0.0, "duration": 0.0}
+
+        return self._scheduled_move(
+            ("hotel", hotel),
+            self.resort.hotel_angles[hotel],
+            lambda cancel: self.resort.activate_hotel(hotel, cancel=cancel),
+            priority,
+            deadline,
+        )
+
+    def calibrate(self, hotels=None, repeats=1, priority="normal") -> Dict[str, Any]:
+        """
+        Calibrate hotels (all if None) from both directions, as one queued move
+
+        Returns:
+            dict: Scheduler result plus the new 'calibration' entries
+        """
+        self._require_connection()
+        hotels = list(hotels or self.resort.hotels)
+        unknown = [hotel for hotel in hotels if hotel not in self.resort.hotels]
+        if unknown:
+            raise ValueError(f"Hotels {unknown} not found. Available: {self.resort.hotels}")
+        if repeats < 1:
+            raise ValueError("repeats must be at least 1")
+
+        result = self._scheduled_move(
+            ("calibrate", ",".join(hotels)),
+            self.resort.hotel_angles[hotels[0]],
+            lambda cancel: bool(self.resort.calibrate(hotels, repeats, cancel)),
+            priority,
+            None,
+            timed=False,
+        )
+        self._save_calibration()
+        calibration = self.resort.calibration
+        return {**result, "calibration": {h: calibration[h] for h in hotels if h in calibration}}
+
+    def calibration(self) -> Dict[str, Any]:
+        """Per-hotel calibration table"""
+        return {"calibration": dict(self.resort.calibration)}
+
+    def clear_calibration(self, hotels=None) -> Dict[str, Any]:
+        """Drop calibration entries (all if None); those hotels use nominal targets"""
         with self.lock:
-            if not self.connected:
-                raise RuntimeError("Not connected to motor")
-            
-            if not self.resort:
-                raise RuntimeError("Resort not initialized")
-            
-            return self.resort.activate_hotel(hotel)
+            if hotels is None:
+                self.resort.calibration = {}
+            else:
+                self.resort.calibration = {
+                    h: e for h, e in self.resort.calibration.items() if h not in hotels
+                }
+        self._save_calibration()
+        return self.calibration()
 
-    def go_home(self):
+    def _save_calibration(self):
+        if self.store:
+            self.store.set_state("calibration", json.dumps(self.resort.calibration))
+
+    def go_home(self, priority="normal", deadline=None, dry_run=False):
         """Return to home position"""
-        with self.lock:
-            if not self.connected:
-                raise RuntimeError("Not connected to motor")
-            
-            if not self.resort:
-                raise RuntimeError("Resort not initialized")
-            
-            return self.resort.go_home()
+        if dry_run:
+            return self._plan(self.resort.go_home(dry_run=True))
+
+        self._require_connection()
+        return self._scheduled_move(
+            ("home",), 0.0, lambda cancel: self.resort.go_home(cancel=cancel),
+            priority, deadline,
+        )
 
-    def move_to_angle(self, angle: float):
+    def move_to_angle(self, angle: float, priority="normal", deadline=None, dry_run=False):
         """Move to specific angle in degrees"""
+        if dry_run:
+            return self._plan(self.resort.move_to_angle(angle, dry_run=True))
+
+        self._require_connection()
+        return self._scheduled_move(
+            ("angle", angle), angle,
+            lambda cancel: self.resort.move_to_angle(angle, cancel=cancel),
+            priority, deadline,
+        )
+
+    def estimate(self, targets) -> Dict[str, Any]:
+        """Predict move durations from the current position"""
         with self.lock:
-            if not self.connected:
-                raise RuntimeError("Not connected to motor")
-            
             if not self.resort:
                 raise RuntimeError("Resort not initialized")
-            
-            return self.resort.move_to_angle(angle)
+
+            # Fall back to the last known position while disconnected
+            if self.connected:
+                from_angle = self.resort.get_current_position()
+            else:
+                from_angle = self.resort.last_position
+            estimates = [self.resort.estimate_move(t, from_angle) for t in targets]
+
+        return {"from_angle": from_angle, "estimates": estimates}
+
+    def place_plate(self, plate_id: str, hotel: str, room: Optional[int] = None) -> Dict[str, Any]:
+        """Record a plate in a hotel room (lowest free room if None)"""
+        hotel, room = self.resort.inventory.place(plate_id, hotel, room)
+        if self.store:
+            self.store.put_plate(plate_id, hotel, room)
+        return {"plate_id": plate_id, "hotel": hotel, "room": room}
+
+    def remove_plate(self, plate_id: str) -> Dict[str, Any]:
+        """Remove a plate from the inventory"""
+        hotel, room = self.resort.inventory.remove(plate_id)
+        if self.store:
+            self.store.delete_plate(plate_id)
+        return {"plate_id": plate_id, "hotel": hotel, "room": room}
+
+    def locate_plate(self, plate_id: str) -> Dict[str, Any]:
+        """Find the hotel and room holding a plate"""
+        hotel, room = self.resort.inventory.locate(plate_id)
+        return {"plate_id": plate_id, "hotel": hotel, "room": room}
+
+    def list_plates(self) -> Dict[str, Any]:
+        """List all plates and their slots"""
+        plates = self.resort.inventory.plates()
+        return {
+            "count": len(plates),
+            "plates": [
+                {"plate_id": plate_id, "hotel": hotel, "room": room}
+                for plate_id, (hotel, room) in plates.items()
+            ],
+        }
+
+    def plate_at(self, hotel: str, room: int) -> Dict[str, Any]:
+        """Find the plate occupying a slot"""
+        return {"hotel": hotel, "room": room, "plate_id": self.resort.inventory.plate_at(hotel, room)}
+
+    def free_slots(self, hotel: Optional[str] = None) -> Dict[str, Any]:
+        """List free slots, optionally for one hotel"""
+        slots = self.resort.inventory.free_slots(hotel)
+        return {
+            "count": len(slots),
+            "slots": [{"hotel": h, "room": room} for h, room in slots],
+        }
+
+    def activate_plate(self, plate_id: str, priority="normal", deadline=None, dry_run=False):
+        """Move to the hotel holding a plate"""
+        hotel, room = self.resort.inventory.locate(plate_id)
+        result = self.activate_hotel(hotel, priority, deadline, dry_run)
+        if not dry_run:
+            self._record_access(plate_ids=[plate_id])
+        return {"plate_id": plate_id, "hotel": hotel, "room": room, **result}
+
+    def recommend_slot(self, plate_id: Optional[str] = None) -> Dict[str, Any]:
+        """Recommend a slot for a new or returning plate"""
+        slot = self.resort.recommend_slot(plate_id)
+        if slot is None:
+            raise ValueError("No free slots")
+        hotel, room = slot
+        return {
+            "plate_id": plate_id,
+            "hotel": hotel,
+            "room": room,
+            "expected_rotation": self.resort.hotel_costs()[hotel],
+            "plate_accesses": self.resort.inventory.plate_hits[plate_id] if plate_id else 0,
+        }
+
+    def rebalance_plan(self) -> Dict[str, Any]:
+        """Plan plate moves that put frequently accessed plates in the cheapest hotels"""
+        return {
+            "hotel_costs": self.resort.hotel_costs(),
+            "hotel_accesses": dict(self.resort.inventory.hotel_hits),
+            **self.resort.rebalance_plan(),
+        }
+
+    def start_retrieval(self, plates: List[str], slots: List[Dict[str, Any]],
+                        priority="normal", release_timeout=None) -> RetrievalJob:
+        """
+        Plan and start a bulk retrieval of plates and/or (hotel, room) slots
+
+        Targets are grouped by hotel and visited once each in an order that
+        minimises rotation. At every hotel the job holds the motor until
+        release_retrieval() is called or release_timeout elapses.
+        """
+        self._require_connection()
+        self.last_request = time.time()
+        rooms: Dict[str, List[Dict[str, Any]]] = {}
+        for plate_id in plates:
+            hotel, room = self.resort.inventory.locate(plate_id)
+            rooms.setdefault(hotel, []).append({"plate_id": plate_id, "room": room})
+        for slot in slots:
+            plate_id = self.resort.inventory.plate_at(slot["hotel"], slot["room"])
+            rooms.setdefault(slot["hotel"], []).append({"plate_id": plate_id, "room": slot["room"]})
+
+        order = self.resort.plan_visits(list(rooms))
+        job = RetrievalJob([{"hotel": hotel, "slots": rooms[hotel]} for hotel in order])
+        if release_timeout is None:
+            release_timeout = self.server_config.get("release_timeout", 300)
+        self.jobs[job.id] = job
+        threading.Thread(
+            target=self._run_retrieval, args=(job, priority, release_timeout), daemon=True
+        ).start()
+        return job
+
+    def _run_retrieval(self, job: RetrievalJob, priority, release_timeout):
+        job.events.put({"event": "planned", "job_id": job.id, "stops": job.stops})
+        try:
+            for index, stop in enumerate(job.stops):
+                hotel = stop["hotel"]
+                if job.abort.is_set():
+                    job.events.put({"event": "aborted", "stop": index, "hotel": hotel})
+                    return
+
+                self._record_access(hotel, [s["plate_id"] for s in stop["slots"] if s["plate_id"]])
+                released = {}
+
+                def visit(cancel):
+                    with self.lock:
+                        self._require_connection()
+                        reached = self.resort.activate_hotel(hotel, cancel=cancel)
+                    # Only hold the motor at a hotel actually reached
+                    if reached and not job.abort.is_set():
+                        job.release.clear()
+                        job.events.put({"event": "arrived", "stop": index, "reached": reached, **stop})
+                        self.scheduler.begin_hold(release_timeout)
+                        try:
+                            released[hotel] = job.release.wait(release_timeout)
+                        finally:
+                            self.scheduler.end_hold()
+                    return reached
+
+                result = self.scheduler.run(
+                    ("retrieve", job.id, hotel), self.resort.hotel_angles[hotel], visit, priority
+                )
+                if job.abort.is_set():
+                    job.events.put({"event": "aborted", "stop": index, "hotel": hotel})
+                    return
+                if not result["reached"]:
+                    job.events.put({"event": "error", "stop": index, "hotel": hotel,
+                                    "detail": f"Hotel {hotel} not reached"})
+                    return
+                if not released[hotel]:
+                    job.events.put({"event": "release_timeout", "stop": index, "hotel": hotel})
+                    return
+                job.events.put({"event": "released", "stop": index, "hotel": hotel})
+            job.events.put({"event": "done", "job_id": job.id})
+        except Exception as e:
+            job.events.put({"event": "error", "detail": str(e)})
+        finally:
+            job.events.put(None)
+            self.jobs.pop(job.id, None)
+
+    def retrieval_events(self, job: RetrievalJob) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Yield progress events of a retrieval job until it finishes
+
+        While no event is due, None is yielded every `retrieval_keepalive`
+        seconds so the consumer can probe its client. Closing the iterator
+        before the job finishes aborts the job and releases the motor.
+        """
+        keepalive = self.server_config.get("retrieval_keepalive", 5.0)
+        try:
+            while True:
+                try:
+                    event = job.events.get(timeout=keepalive)
+                except queue.Empty:
+                    yield None
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            job.abort.set()
+            job.release.set()
+
+    def release_retrieval(self, job_id: str):
+        """Release the motor at the current stop of a retrieval job"""
+        self.jobs[job_id].release.set()
+
+    def idempotent(self, key: str, method: str, *args):
+        """
+        Call a mutating method once per idempotency key
+
+        Returns:
+            (result, replayed): replayed is True for a repeated key, whose
+            original result is returned without calling the method again
+        """
+        if method not in IDEMPOTENT_METHODS:
+            raise ValueError(f"{method} does not take an idempotency key")
+        return self.idempotency.run(key, [method, args], lambda: getattr(self, method)(*args))
+
+    def move_history(self, limit: int = 50, target: Optional[str] = None) -> Dict[str, Any]:
+        """Recent moves from the state store"""
+        if not self.store:
+            return {"error": "state store disabled"}
+        return {"moves": self.store.recent_moves(limit, target)}
+
+    def queue_status(self) -> Dict[str, Any]:
+        """Get motion queue depth and expected waits"""
+        return self.scheduler.stats()
 
     def get_current_position(self):
         """Get current motor position in degrees"""
@@ -189,12 +909,19 @@ class PlateResortWrapper:
             return self.resort.set_speed(speed)
 
     def emergency_stop(self):
-        """Emergency stop motor"""
-        with self.lock:
-            if not self.resort:
-                raise RuntimeError("Resort not initialized")
-            
-            return self.resort.emergency_stop()
+        """
+        Emergency stop motor
+
+        Does not take the lock, which a move holds until it finishes: the
+        torque-off write waits only for the bus transaction in flight, then
+        the running move is cancelled so it stops polling at once.
+        """
+        if not self.resort:
+            raise RuntimeError("Resort not initialized")
+
+        result = self.resort.emergency_stop()
+        self.scheduler.cancel_active()
+        return result
 
     def get_hotels(self) -> Dict[str, Any]:
         """Get available hotels and their angles"""
@@ -205,4 +932,133 @@ class PlateResortWrapper:
             "hotels": list(self.resort.hotels),
             "hotel_angles": dict(self.resort.hotel_angles),
             "rooms_per_hotel": self.resort.rooms
-        }
\ No newline at end of file
+        }
+
+    def snapshot(self, fields=SNAPSHOT_FIELDS) -> Dict[str, Any]:
+        """
+        Status, health, hotels and position from one read under the lock
+
+        Args:
+            fields: Sections to include (see SNAPSHOT_FIELDS); the bus is only
+                read for the ones that need it
+        """
+        snapshot = {}
+        health = None
+        position = None
+        error = None
+        with self.lock:
+            if self.connected and "health" in fields:
+                try:
+                    health = self.resort.get_motor_health()
+                    position = health["position"]
+                except Exception as e:
+                    error = str(e)
+            elif self.connected and ("status" in fields or "position" in fields):
+                try:
+                    position = self.resort.get_current_position()
+                except Exception as e:
+                    error = str(e)
+            state = self.motion_state()
+
+        if "status" in fields:
+            snapshot["status"] = {
+                "connected": state["connected"],
+                "position": position,
+                "active_hotel": state["active_hotel"] if state["connected"] else None,
+                "queue_depth": state["queue_depth"],
+                "moving": state["moving"],
+                "version": state["version"],
+            }
+            if error:
+                snapshot["status"]["error"] = error
+        if "health" in fields:
+            if health is not None:
+                snapshot["health"] = health
+            else:
+                snapshot["health"] = {"error": error or "not connected"}
+        if "hotels" in fields:
+            snapshot["hotels"] = self.get_hotels()
+        if "position" in fields:
+            snapshot["position"] = position
+        if health is not None:
+            self._publish_status(**self._health_fields(health))
+        return snapshot
+
+    def describe(self) -> Dict[str, Any]:
+        """Device, motor ID, hotels and connection state of this resort"""
+        return {
+            "device": self.resort.device,
+            "motor_id": self.resort.motor_id,
+            "hotels": self.resort.hotels,
+            "connected": self.connected,
+        }
+
+
+def load_config():
+    """Load configuration from YAML file"""
+    config_file = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "resort_config.yaml",
+    )
+    try:
+        with open(config_file, "r") as f:
+            return yaml.safe_load(f)
+    except Exception as e:
+        print(f"Warning: Could not load config file {config_file}: {e}")
+        return {}
+
+
+def resort_ids(config) -> List[str]:
+    """IDs of the configured resorts, in config order"""
+    entries = config.get("resorts") or [{"id": "default"}]
+    return [str(entry["id"]) for entry in entries]
+
+
+def resort_overrides(config, resort_id: str) -> Dict[str, Any]:
+    """Resort settings a `resorts` entry overrides (KeyError if not listed)"""
+    entries = config.get("resorts") or [{"id": "default"}]
+    for entry in entries:
+        if str(entry["id"]) == resort_id:
+            return {k: v for k, v in entry.items() if k not in ("id", "state_db")}
+    raise KeyError(f"resort {resort_id} is no longer configured")
+
+
+def load_wrappers(config) -> Dict[str, PlateResortWrapper]:
+    """
+    Build one wrapper per configured resort, keyed by resort ID
+
+    Each entry of the `resorts` list overrides the shared `resort` section
+    (device, motor_id, hotels, offset_angle, ...). Every resort gets its own
+    lock, motion scheduler and state database, so resorts on different
+    serial adapters move in parallel. Two resorts on the same device would
+    open the port twice and move without a common lock, so that is
+    rejected. Without a `resorts` list a single resort with ID "default" is
+    served.
+    """
+    server_config = config.get("server", {})
+    entries = config.get("resorts") or [{"id": "default"}]
+    wrappers = {}
+    devices = {}
+    for entry in entries:
+        overrides = dict(entry)
+        resort_id = str(overrides.pop("id"))
+        if resort_id in wrappers:
+            raise ValueError(f"Duplicate resort ID {resort_id}")
+
+        resort_server_config = dict(server_config)
+        state_db = overrides.pop("state_db", None)
+        if state_db is None and len(entries) > 1 and server_config.get("state_db"):
+            root, ext = os.path.splitext(server_config["state_db"])
+            state_db = f"{root}-{resort_id}{ext}"
+        if state_db is not None:
+            resort_server_config["state_db"] = state_db
+
+        wrapper = PlateResortWrapper(resort_server_config, overrides, resort_id)
+        device = wrapper.resort.device
+        if device in devices:
+            raise ValueError(
+                f"Resorts {devices[device]} and {resort_id} both use device {device}"
+            )
+        devices[device] = resort_id
+        wrappers[resort_id] = wrapper
+    return wrappers
\ No newline at end of file
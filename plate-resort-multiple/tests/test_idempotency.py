@@ -0,0 +1,37 @@
+"""Idempotency key replay and reuse"""
+import pytest
+
+from plate_resort.server.idempotency import IdempotencyCache, IdempotencyKeyReused
+
+
+def test_repeated_key_replays_the_result():
+    cache = IdempotencyCache()
+    calls = []
+    assert cache.run("k", ["activate_hotel", ["A"]], lambda: calls.append(1) or "moved") == ("moved", False)
+    assert cache.run("k", ["activate_hotel", ["A"]], lambda: calls.append(1) or "again") == ("moved", True)
+    assert len(calls) == 1
+
+
+def test_key_reused_for_a_different_request():
+    cache = IdempotencyCache()
+    cache.run("k", ["activate_hotel", ["A"]], lambda: True)
+    with pytest.raises(IdempotencyKeyReused):
+        cache.run("k", ["activate_hotel", ["B"]], lambda: True)
+
+
+def test_failed_request_is_not_stored():
+    cache = IdempotencyCache()
+
+    def fail():
+        raise RuntimeError("Not connected to motor")
+
+    with pytest.raises(RuntimeError):
+        cache.run("k", ["go_home", []], fail)
+    assert cache.run("k", ["go_home", []], lambda: True) == (True, False)
+
+
+def test_least_recently_used_keys_are_evicted():
+    cache = IdempotencyCache(max_keys=2)
+    for key in ("a", "b", "c"):
+        cache.run(key, [key], lambda: key)
+    assert list(cache.entries) == ["b", "c"]
@@ -0,0 +1,83 @@
+"""Native Protocol 2.0 framing: CRC-16 and byte stuffing"""
+import struct
+
+from dynamixel_sdk import Protocol2PacketHandler
+from dynamixel_sdk.robotis_def import COMM_SUCCESS
+
+from plate_resort.protocol import (
+    HEADER, INST_STATUS, INST_WRITE, STUFFED, STUFFING, NativePacketHandler, crc16,
+)
+
+
+class LoopbackPort:
+    """Port recording what is written and answering with queued bytes"""
+
+    def __init__(self, reply=b""):
+        self.is_using = False
+        self.written = b""
+        self.reply = bytearray(reply)
+
+    def clearPort(self):
+        pass
+
+    def writePort(self, packet):
+        self.written += bytes(packet)
+        return len(packet)
+
+    def readPort(self, length):
+        data, self.reply = bytes(self.reply[:length]), self.reply[length:]
+        return data
+
+    def setPacketTimeout(self, packet_length):
+        pass
+
+    def isPacketTimeout(self):
+        return True
+
+
+def status_packet(dxl_id, params, error=0):
+    """Status packet as a motor sends it, stuffed and CRC'd"""
+    body = bytes([INST_STATUS, error]) + bytes(params)
+    body = body.replace(b"\xff\xff\xfd", STUFFED)
+    packet = HEADER + bytes([dxl_id]) + struct.pack("<H", len(body) + 2) + body
+    return packet + struct.pack("<H", crc16(packet))
+
+
+def test_crc16_matches_the_protocol_example():
+    # Ping of ID 1 from the Protocol 2.0 manual: CRC bytes 0x19 0x4E
+    assert crc16(bytes.fromhex("fffffd0001030001")) == 0x4E19
+
+
+def test_crc16_matches_the_sdk():
+    data = bytes(range(256)) * 2
+    assert crc16(data) == Protocol2PacketHandler().updateCRC(0, list(data), len(data))
+    assert crc16(memoryview(data)[10:]) == crc16(data[10:])
+
+
+def test_write_stuffs_the_header_pattern():
+    payload = [0x01, 0xFF, 0xFF, 0xFD, 0x02]
+    port = LoopbackPort()
+    assert NativePacketHandler().writeTxOnly(port, 1, 116, len(payload), payload) == COMM_SUCCESS
+
+    packet = port.written
+    assert packet[:5] == HEADER + b"\x01"
+    assert struct.unpack_from("<H", packet, 5)[0] == len(packet) - 7
+    assert struct.unpack_from("<H", packet, len(packet) - 2)[0] == crc16(packet[:-2])
+    body = packet[7:-2]
+    assert STUFFED in body
+    assert body.replace(STUFFED, STUFFING) == bytes([INST_WRITE, 116, 0] + payload)
+
+
+def test_stuffed_read_round_trip():
+    data = bytes([0xFF, 0xFF, 0xFD, 0x07])
+    port = LoopbackPort(status_packet(1, data))
+    result, comm, error = NativePacketHandler().readTxRx(port, 1, 132, len(data))
+    assert (result, comm, error) == (data, COMM_SUCCESS, 0)
+    assert not port.is_using
+
+
+def test_corrupt_status_packet_is_rejected():
+    packet = bytearray(status_packet(1, b"\x10\x00\x00\x00"))
+    packet[-3] ^= 0x01
+    _, comm, _ = NativePacketHandler().readTxRx(LoopbackPort(packet), 1, 132, 4)
+    assert comm != COMM_SUCCESS
@@ -0,0 +1,150 @@
+"""Motion scheduler ordering, coalescing and position tracking"""
+import threading
+import time
+
+import pytest
+
+from plate_resort.server.scheduler import DeadlineError, MotionScheduler, MotionTicket
+
+
+def tickets(*angles, **kwargs):
+    return [MotionTicket(("angle", a), a, **kwargs) for a in angles]
+
+
+def select(scheduler, pending, position, direction=1):
+    now = max(t.submitted for t in pending)
+    return scheduler._select(pending, position, direction, now).target_angle
+
+
+def test_sstf_picks_nearest_target():
+    pending = tickets(300.0, 90.0, 140.0)
+    assert select(MotionScheduler("sstf"), pending, 120.0) == 140.0
+
+
+def test_sstf_aging_favours_long_waiting_requests():
+    scheduler = MotionScheduler("sstf", aging=10.0)
+    near, far = tickets(130.0, 300.0)
+    far.submitted -= 30.0  # 300° less travel, now the better choice
+    assert scheduler._select([near, far], 120.0, 1, near.submitted) is far
+
+
+def test_scan_keeps_direction_of_travel():
+    pending = tickets(100.0, 200.0)
+    scheduler = MotionScheduler("scan")
+    assert select(scheduler, pending, 110.0, direction=1) == 200.0
+    assert select(scheduler, pending, 110.0, direction=-1) == 100.0
+    # Reverses once nothing is left ahead
+    assert select(scheduler, tickets(100.0), 110.0, direction=1) == 100.0
+
+
+def test_fifo_ignores_distance():
+    pending = tickets(300.0, 110.0)
+    assert select(MotionScheduler("fifo"), pending, 100.0) == 300.0
+
+
+def test_priority_then_deadline_before_policy():
+    scheduler = MotionScheduler("sstf")
+    near = MotionTicket(("angle", 1), 101.0, "background")
+    far = MotionTicket(("angle", 2), 300.0, "critical")
+    assert select(scheduler, [near, far], 100.0) == 300.0
+
+    no_deadline, late, soon = (
+        MotionTicket(("angle", 3), 101.0),
+        MotionTicket(("angle", 4), 200.0, deadline=60.0),
+        MotionTicket(("angle", 5), 300.0, deadline=30.0),
+    )
+    assert select(scheduler, [no_deadline, late, soon], 100.0) == 300.0
+
+
+def test_requests_for_the_same_target_share_one_move():
+    scheduler = MotionScheduler()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def move(cancel):
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return True
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(scheduler.run(("hotel", "A"), 90.0, move)))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(scheduler.run(("hotel", "A"), 90.0, move)))
+    second.start()
+    while scheduler._active.shared == 0:
+        time.sleep(0.01)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert len(calls) == 1
+    assert sorted(r["coalesced"] for r in results) == [False, True]
+    assert all(r["reached"] and r["shared_with"] == 1 for r in results)
+
+
+def test_position_comes_from_the_motor_after_a_short_move():
+    position = {"angle": 0.0}
+    scheduler = MotionScheduler(locate=lambda: position["angle"])
+
+    def stalled(cancel):
+        position["angle"] = 40.0  # Timed out on the way to 90°
+        return False
+
+    scheduler.run(("hotel", "B"), 90.0, stalled)
+    assert scheduler.position == 40.0
+    assert scheduler.degrees_travelled == 0.0  # Position was unknown before
+
+    scheduler.run(("hotel", "B"), 90.0, lambda cancel: position.update(angle=90.0))
+    assert scheduler.position == 90.0
+    assert scheduler.degrees_travelled == 50.0
+
+
+def test_deadline_is_checked_when_joining_a_move():
+    scheduler = MotionScheduler(estimate=lambda a, b: 10.0)
+    scheduler.position = 0.0
+    started, release = threading.Event(), threading.Event()
+
+    def move(cancel):
+        started.set()
+        release.wait(5)
+        return True
+
+    runner = threading.Thread(target=lambda: scheduler.run(("hotel", "A"), 90.0, move))
+    runner.start()
+    started.wait(5)
+    try:
+        with pytest.raises(DeadlineError):
+            scheduler.run(("hotel", "A"), 90.0, move, deadline=1.0)
+        assert scheduler._active.shared == 0
+    finally:
+        release.set()
+        runner.join(5)
+
+
+def test_when_idle_holds_off_new_requests():
+    scheduler = MotionScheduler()
+    checking, finish_check = threading.Event(), threading.Event()
+    order = []
+
+    def check():
+        checking.set()
+        finish_check.wait(5)
+        order.append("check")
+        return True
+
+    checker = threading.Thread(target=lambda: order.append(scheduler.when_idle(check)))
+    checker.start()
+    checking.wait(5)
+    mover = threading.Thread(
+        target=lambda: scheduler.run(("hotel", "A"), 90.0, lambda cancel: order.append("move"))
+    )
+    mover.start()
+    time.sleep(0.05)
+    finish_check.set()
+    checker.join(5)
+    mover.join(5)
+
+    assert order.index("check") < order.index("move")
+    assert scheduler.when_idle(lambda: True) is True